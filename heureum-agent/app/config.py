@@ -5,7 +5,7 @@ Application configuration using pydantic-settings.
 """
 
 from enum import Enum
-from typing import List, Set
+from typing import FrozenSet, List, Set
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -15,7 +15,7 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 # ---------------------------------------------------------------------------
 
 # TODO: client-side에서 tool 목록을 관리하도록 이전 필요 (서버가 결정할 사항이 아님)
-CLIENT_TOOLS: Set[str] = {
+CLIENT_TOOLS: FrozenSet[str] = frozenset({
     "ask_question",
     "bash",
     "select_cwd",
@@ -36,7 +36,7 @@ CLIENT_TOOLS: Set[str] = {
     "share_content",
     "trigger_haptic",
     "open_url",
-}
+})
 
 # Session file tools — executed server-side via Platform API
 SESSION_FILE_TOOLS: Set[str] = {
@@ -130,6 +130,17 @@ class Settings(BaseSettings):
     # Session
     SESSION_TTL_SECONDS: int = 3600  # 1 hour
     MAX_SESSIONS: int = 1000
+    # Rehydrate unknown sessions from Platform DB on cache miss
+    SESSION_REHYDRATION_ENABLED: bool = False
+    PLATFORM_API_TIMEOUT: float = 5.0  # seconds
+
+    # Platform internal API retry / circuit breaker (tool services)
+    PLATFORM_API_MAX_RETRIES: int = 2
+    PLATFORM_API_RETRY_BASE_DELAY: float = 0.2  # seconds, full-jitter backoff
+    PLATFORM_API_RETRY_MAX_DELAY: float = 2.0  # seconds
+    PLATFORM_API_CALL_BUDGET: float = 15.0  # seconds per tool call, all attempts
+    PLATFORM_API_BREAKER_THRESHOLD: int = 5  # consecutive failures to open
+    PLATFORM_API_BREAKER_RESET: float = 30.0  # seconds before a trial call
 
     # Context overflow
     MAX_OVERFLOW_RETRIES: int = 3
@@ -138,6 +149,9 @@ class Settings(BaseSettings):
     # LLM retry (transient / retryable errors)
     MAX_LLM_RETRIES: int = 2
     LLM_RETRY_BASE_DELAY: float = 1.0  # seconds, doubles each retry
+    # Race the no-tools and stripped-history fallbacks instead of trying
+    # them in turn; saves a round-trip but both calls may be billed
+    LLM_PARALLEL_FALLBACKS: bool = False
 
     # MCP
     TOOL_CACHE_TTL: int = 300  # 5 minutes
@@ -29,6 +29,8 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     print("Starting Heureum Agent Service...")
     yield
     print("Shutting down Heureum Agent Service...")
+    await agent.agent_service.aclose()
+    await agent.platform_client.aclose()
 
 
 app = FastAPI(
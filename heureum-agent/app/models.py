@@ -6,7 +6,30 @@ from enum import Enum
 from typing import Any, Dict, List, Optional
 
 from app.schemas.open_responses import MessageRole, Usage
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
+
+
+class _SizeMemo:
+    """Cached size estimates for one ``Message``.
+
+    Always compares equal, so two messages with the same fields stay equal
+    whether or not either has been measured.
+
+    Attributes:
+        tool_calls_chars (Optional[int]): Serialised size of ``tool_calls``.
+        content_tokens (Optional[int]): Estimated token count of ``content``.
+    """
+
+    __slots__ = ("tool_calls_chars", "content_tokens")
+
+    def __init__(self) -> None:
+        self.tool_calls_chars: Optional[int] = None
+        self.content_tokens: Optional[int] = None
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _SizeMemo)
+
+    __hash__ = None  # type: ignore[assignment]
 
 
 class Message(BaseModel):
@@ -30,6 +53,10 @@ class Message(BaseModel):
     tool_name: Optional[str] = None
     usage: Optional[Dict[str, Any]] = None
 
+    # Memoised size estimates (see compaction.tokens); not part of the
+    # model's fields, its serialised form, or its equality.
+    _sizes: _SizeMemo = PrivateAttr(default_factory=_SizeMemo)
+
 
 class AgentRequest(BaseModel):
     """Agent request model.
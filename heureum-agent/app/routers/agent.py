@@ -40,6 +40,7 @@ from app.services.agent_service import AgentService
 from app.services.notification_service import NotificationService
 from app.services.periodic_task_service import PeriodicTaskService
 from app.services.providers.mcp import MCPClient
+from app.services.reliability import CircuitBreaker, make_platform_client
 from app.services.todo_service import TodoService
 from app.services.tool_chain import ToolChainRegistry
 from fastapi import APIRouter
@@ -51,10 +52,18 @@ router = APIRouter()
 
 chain_registry = ToolChainRegistry()
 mcp_client = MCPClient(chain_registry=chain_registry)
-agent_service = AgentService()
-todo_service = TodoService()
-periodic_task_service = PeriodicTaskService()
-notification_service = NotificationService()
+# One keep-alive client for the internal Platform endpoints behind session
+# rehydration and the TODO, periodic-task and notification tools.
+platform_client = make_platform_client()
+agent_service = AgentService(http_client=platform_client)
+platform_breaker = CircuitBreaker("Platform API")
+todo_service = TodoService(http_client=platform_client, breaker=platform_breaker)
+periodic_task_service = PeriodicTaskService(
+    http_client=platform_client, breaker=platform_breaker
+)
+notification_service = NotificationService(
+    http_client=platform_client, breaker=platform_breaker
+)
 _initialized = False
 _init_lock = asyncio.Lock()
 _session_loop_locks: Dict[str, asyncio.Lock] = {}
@@ -75,7 +84,10 @@ atexit.register(_atexit_close_mcp)
 
 def _get_loop_lock(session_id: str) -> asyncio.Lock:
     """Serialize full loop executions per session."""
-    return _session_loop_locks.setdefault(session_id, asyncio.Lock())
+    lock = _session_loop_locks.get(session_id)
+    if lock is None:
+        lock = _session_loop_locks[session_id] = asyncio.Lock()
+    return lock
 
 
 def _cleanup_stale_locks() -> None:
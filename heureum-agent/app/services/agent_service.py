@@ -16,12 +16,15 @@ import asyncio
 import logging
 import os
 import re
+import threading
 import time
 import uuid
 from collections.abc import MutableMapping
 from dataclasses import replace
+from functools import cached_property
 from typing import Any, Dict, List, Optional, Tuple
 
+import httpx
 from app.config import settings
 from app.models import AgentResponse, LLMResult, LLMResultType, Message, ToolCallInfo
 from app.schemas.open_responses import (
@@ -37,8 +40,14 @@ from app.services.compaction import (
     truncate_oversized_tool_results,
 )
 from app.services.compaction.summarizer import compact_history
-from app.services.compaction.tokens import estimate_messages_tokens
-from app.services.prompts.base import build_system_prompt
+from app.services.compaction.tokens import estimate_message_tokens, estimate_messages_tokens
+from app.services.prompts.base import (
+    COMPACTION_PREFIX,
+    build_identity_prompt,
+    build_tools_prompt,
+)
+from app.services.reliability import make_platform_client
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
@@ -62,6 +71,17 @@ _PAGE_HEADER_RE = re.compile(
     re.MULTILINE,
 )
 
+# Prefix of synthetic tool results stored as HumanMessage:
+# "[Tool result: browser_click] Page: ..."
+_TOOL_RESULT_PREFIX = "[Tool result:"
+
+# Upper bound on cached system-prompt / tool-schema variants per AgentService.
+_SYS_PROMPT_CACHE_MAX = 128
+_TOOL_SCHEMA_CACHE_MAX = 128
+
+# Upper bound on request messages awaiting persistence in the LC memo.
+_LC_MEMO_MAX = 1024
+
 
 def _extract_page_header(content: str) -> str:
     """Extract a short 'Page: ... URL: ...' summary from browser tool output."""
@@ -75,37 +95,55 @@ def _extract_page_header(content: str) -> str:
     return first_line
 
 
+# A DOM snapshot either starts with its page header or lists interactive
+# elements near the top; only this prefix is ever inspected.
+_PAGE_SNAPSHOT_PREFIX = "Page:"
+_PAGE_SNAPSHOT_MARKER = "[Interactive Elements]"
+_PAGE_SNAPSHOT_SCAN_CHARS = 500
+
+
 def _is_browser_page_content(content: str) -> bool:
     """Check if content looks like a browser page DOM snapshot."""
-    return content.startswith("Page:") or "[Interactive Elements]" in content[:500]
+    return (
+        content.startswith(_PAGE_SNAPSHOT_PREFIX)
+        or content.find(_PAGE_SNAPSHOT_MARKER, 0, _PAGE_SNAPSHOT_SCAN_CHARS) != -1
+    )
 
 
-def _invalidate_stale_browser_results(lc_history: list) -> int:
+def _invalidate_stale_browser_results(lc_history: list, start: int = 0) -> Tuple[int, int]:
     """Replace older browser page DOM results with short summaries.
 
     Walks the history backwards.  The most recent ToolMessage containing
     page content is kept intact; all older ones from browser page tools
     are replaced with a one-line summary.
 
-    Returns the number of messages replaced.
+    Args:
+        lc_history (list): LangChain history, modified in place.
+        start (int): Lowest index to inspect. Callers pass the position of
+            the snapshot kept by the previous run, since everything before
+            it has already been invalidated. Defaults to ``0``.
+
+    Returns:
+        Tuple[int, int]: The number of messages replaced and the index of
+            the snapshot that was kept (``-1`` if none was found).
     """
     replaced = 0
-    seen_latest = False
+    latest = -1
 
-    for i in range(len(lc_history) - 1, -1, -1):
+    for i in range(len(lc_history) - 1, start - 1, -1):
         msg = lc_history[i]
 
         if isinstance(msg, ToolMessage):
             content = msg.content or ""
             if _is_browser_page_content(content):
-                if not seen_latest:
-                    seen_latest = True
+                if latest < 0:
+                    latest = i
                     continue
                 # This is an older page snapshot — replace it
                 summary = _extract_page_header(content)
                 lc_history[i] = ToolMessage(
                     content=f"[Stale page snapshot replaced] {summary}",
-                    tool_call_id=getattr(msg, "tool_call_id", "unknown"),
+                    tool_call_id=msg.tool_call_id or "unknown",
                 )
                 replaced += 1
 
@@ -113,13 +151,13 @@ def _invalidate_stale_browser_results(lc_history: list) -> int:
             # Synthetic tool results stored as HumanMessage:
             # "[Tool result: browser_click] Page: ..."
             content = msg.content or ""
-            if content.startswith("[Tool result:"):
+            if content.startswith(_TOOL_RESULT_PREFIX):
                 # Strip prefix to check the actual tool output
-                bracket_end = content.find("]")
-                body = content[bracket_end + 1:].lstrip() if bracket_end > 0 else content
+                _, sep, body = content.partition("]")
+                body = body.lstrip() if sep else content
                 if _is_browser_page_content(body):
-                    if not seen_latest:
-                        seen_latest = True
+                    if latest < 0:
+                        latest = i
                         continue
                     summary = _extract_page_header(body)
                     lc_history[i] = HumanMessage(
@@ -127,7 +165,7 @@ def _invalidate_stale_browser_results(lc_history: list) -> int:
                     )
                     replaced += 1
 
-    return replaced
+    return replaced, latest
 
 
 def create_llm():
@@ -171,6 +209,29 @@ def create_llm():
         )
 
 
+# Process-wide LLM clients keyed by the settings that shape them, so every
+# AgentService (and its HTTP connection pool) shares one client instance.
+_LLM_CACHE: Dict[Tuple[Any, ...], BaseChatModel] = {}
+_LLM_CACHE_LOCK = threading.Lock()
+
+
+def get_shared_llm() -> BaseChatModel:
+    """Return the shared LLM client for the current settings, creating it once."""
+    key = (
+        settings.AGENT_MODEL,
+        settings.AGENT_TEMPERATURE,
+        settings.AGENT_MAX_TOKENS,
+        bool(settings.GOOGLE_API_KEY),
+    )
+    llm = _LLM_CACHE.get(key)
+    if llm is None:
+        with _LLM_CACHE_LOCK:
+            llm = _LLM_CACHE.get(key)
+            if llm is None:
+                llm = _LLM_CACHE[key] = create_llm()
+    return llm
+
+
 def _is_context_overflow_error(error: Exception) -> bool:
     """Check whether an exception indicates a context window overflow.
 
@@ -249,7 +310,7 @@ def _strip_tool_messages(lc_messages: list) -> tuple[list, bool]:
     clean: list = []
     changed = False
     for msg in lc_messages:
-        if isinstance(msg, AIMessage) and getattr(msg, "tool_calls", None):
+        if isinstance(msg, AIMessage) and msg.tool_calls:
             summary = ", ".join(
                 f"{tc['name']}({tc.get('args', {})})" for tc in msg.tool_calls
             )
@@ -267,9 +328,10 @@ def _normalize_usage_metadata(usage: Optional[Dict[str, Any]]) -> Optional[Dict[
     """Normalize usage dict to LangChain ``usage_metadata`` shape."""
     if not usage:
         return None
-    input_tokens = int(usage.get("input_tokens", 0) or 0)
-    output_tokens = int(usage.get("output_tokens", 0) or 0)
-    total_tokens = int(usage.get("total_tokens", input_tokens + output_tokens) or 0)
+    input_tokens = int(usage.get("input_tokens") or 0)
+    output_tokens = int(usage.get("output_tokens") or 0)
+    total_tokens = usage.get("total_tokens")
+    total_tokens = int(total_tokens) if total_tokens else input_tokens + output_tokens
     return {
         "input_tokens": input_tokens,
         "output_tokens": output_tokens,
@@ -277,6 +339,29 @@ def _normalize_usage_metadata(usage: Optional[Dict[str, Any]]) -> Optional[Dict[
     }
 
 
+def _platform_record_to_lc(record: Dict[str, Any]) -> Optional[BaseMessage]:
+    """Convert a Platform DB message record into a LangChain message.
+
+    Only plain ``message`` items are restored; tool round-trip items and
+    UI-only records (e.g. ``todo_state``) are skipped.
+    """
+    if record.get("type", "message") != "message":
+        return None
+    content = record.get("content")
+    if isinstance(content, list):
+        text = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    else:
+        text = str(content or "")
+    role = record.get("role")
+    if role == "user":
+        return HumanMessage(content=text)
+    if role == "assistant":
+        return AIMessage(content=text)
+    if role in ("system", "developer"):
+        return SystemMessage(content=text)
+    return None
+
+
 class _SessionMessageView(MutableMapping[str, List[Message]]):
     """Compatibility mapping exposing app ``Message`` histories.
 
@@ -290,12 +375,12 @@ class _SessionMessageView(MutableMapping[str, List[Message]]):
 
     def __getitem__(self, session_id: str) -> List[Message]:
         lc_history = self._service._lc_sessions[session_id]
-        return [self._service._to_app_message(m) for m in lc_history]
+        to_app = self._service._to_app_message
+        return [to_app(m) for m in lc_history]
 
     def __setitem__(self, session_id: str, history: List[Message]) -> None:
-        self._service._lc_sessions[session_id] = [
-            self._service._to_lc_message(m) for m in history
-        ]
+        to_lc = self._service._to_lc_message
+        self._service._lc_sessions[session_id] = [to_lc(m) for m in history]
 
     def __delitem__(self, session_id: str) -> None:
         del self._service._lc_sessions[session_id]
@@ -314,7 +399,8 @@ class _SessionMessageView(MutableMapping[str, List[Message]]):
     def pop(self, session_id: str, default=None):
         if session_id in self._service._lc_sessions:
             lc_history = self._service._lc_sessions.pop(session_id)
-            return [self._service._to_app_message(m) for m in lc_history]
+            to_app = self._service._to_app_message
+            return [to_app(m) for m in lc_history]
         return default
 
 
@@ -331,6 +417,7 @@ class AgentService:
         self,
         compaction_settings: Optional[CompactionSettings] = None,
         mcp_tools: Optional[List[Dict[str, Any]]] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
     ) -> None:
         """Initialize the AgentService.
 
@@ -339,14 +426,67 @@ class AgentService:
                 for the 3-layer compaction pipeline. Uses defaults if None.
             mcp_tools (Optional[List[Dict[str, Any]]]): Pre-discovered MCP
                 tool schemas. Typically set later via ``mcp_tools`` attribute.
+            http_client (Optional[httpx.AsyncClient]): Client for Platform API
+                calls. A pooled client is created (and owned) if None.
         """
         self._lc_sessions: dict[str, List[BaseMessage]] = {}
         self.sessions: MutableMapping[str, List[Message]] = _SessionMessageView(self)
         self._session_locks: dict[str, asyncio.Lock] = {}
         self._session_last_access: dict[str, float] = {}
+        # Negative cache: session_id -> time it was confirmed missing on Platform
+        self._missing_sessions: dict[str, float] = {}
+        self._owns_platform_client = http_client is None
+        # Persistent client — reuses TCP connections across rehydration calls
+        # instead of opening/closing a connection per cache miss.
+        self._platform_client = http_client or make_platform_client()
         self.compaction_settings = compaction_settings or CompactionSettings()
+        # (tool_names, instructions, mcp_tools_version) -> prompt after identity
+        self._sys_prompt_cache: dict[tuple, str] = {}
+        # Same key -> last SystemMessage built, reused while its text matches
+        self._sys_message_cache: dict[tuple, SystemMessage] = {}
+        # (tool_names, mcp_tools_version) -> resolved tool schemas
+        self._tool_schema_cache: dict[tuple, list] = {}
+        # id(request Message) -> (Message, converted LC message); the Message
+        # is held so its id cannot be reused while the entry is alive.
+        self._lc_memo: dict[int, tuple[Message, BaseMessage]] = {}
+        # session_id -> {id(LC message): (LC message, estimated tokens)}
+        self._token_cache: dict[str, dict[int, tuple[BaseMessage, int]]] = {}
+        # session_id -> {tool_call_id: index of its ToolMessage in LC history}.
+        # Positions are hints: they are verified on lookup, since compaction
+        # and overflow recovery rewrite the history list wholesale.
+        self._tool_call_index: dict[str, dict[str, int]] = {}
+        # session_id -> (index, LC message) of the page snapshot kept by the
+        # last invalidation; verified by identity before being trusted.
+        self._page_snapshot_hint: dict[str, tuple[int, BaseMessage]] = {}
+        self._mcp_tools_version = 0
         self.mcp_tools = mcp_tools
-        self.llm = create_llm()
+
+    @property
+    def mcp_tools(self) -> Optional[List[Dict[str, Any]]]:
+        """MCP tool schemas exposed to the LLM.
+
+        Assigning a new list bumps ``_mcp_tools_version`` so prompt caches
+        keyed on it are rebuilt; in-place mutation is not tracked.
+        """
+        return self._mcp_tools
+
+    @mcp_tools.setter
+    def mcp_tools(self, tools: Optional[List[Dict[str, Any]]]) -> None:
+        self._mcp_tools = tools
+        self._mcp_tools_version += 1
+        self._sys_prompt_cache.clear()
+        self._sys_message_cache.clear()
+        self._tool_schema_cache.clear()
+
+    @cached_property
+    def llm(self) -> BaseChatModel:
+        """LLM client, resolved on first use from the process-wide cache."""
+        return get_shared_llm()
+
+    async def aclose(self) -> None:
+        """Close the Platform API client if this service created it."""
+        if self._owns_platform_client:
+            await self._platform_client.aclose()
 
     def _evict_session(self, session_id: str) -> None:
         """Remove all data associated with a session.
@@ -357,6 +497,9 @@ class AgentService:
         self._lc_sessions.pop(session_id, None)
         self._session_locks.pop(session_id, None)
         self._session_last_access.pop(session_id, None)
+        self._token_cache.pop(session_id, None)
+        self._tool_call_index.pop(session_id, None)
+        self._page_snapshot_hint.pop(session_id, None)
 
     def _get_session_lock(self, session_id: str) -> asyncio.Lock:
         """Return the asyncio lock for a session, creating one if needed.
@@ -367,7 +510,10 @@ class AgentService:
         Returns:
             asyncio.Lock: The lock associated with the session.
         """
-        return self._session_locks.setdefault(session_id, asyncio.Lock())
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        return lock
 
     def _get_last_input_tokens(self, session_id: str) -> Optional[int]:
         """Read input tokens from the latest assistant LangChain message."""
@@ -375,17 +521,64 @@ class AgentService:
             if not isinstance(msg, AIMessage):
                 continue
 
-            usage = getattr(msg, "usage_metadata", None) or {}
+            usage = msg.usage_metadata or {}
             if usage.get("input_tokens") is not None:
                 return int(usage["input_tokens"])
 
-            token_usage = getattr(msg, "response_metadata", {}).get("token_usage", {})
+            token_usage = msg.response_metadata.get("token_usage", {})
             if token_usage.get("prompt_tokens") is not None:
                 return int(token_usage["prompt_tokens"])
             if token_usage.get("input_tokens") is not None:
                 return int(token_usage["input_tokens"])
         return None
 
+    def _estimate_session_tokens(self, session_id: str) -> int:
+        """Estimate the session history size, reusing per-message counts.
+
+        Stored LC messages are never mutated in place (replacements create
+        new objects), so a count cached against a message's identity stays
+        valid for as long as that object is in the history.  The cache is
+        rebuilt from the live history on every call, which drops entries for
+        messages that were compacted, replaced or invalidated.
+        """
+        total, counts = self._count_history_tokens(
+            self._lc_sessions.get(session_id, []),
+            self._token_cache.get(session_id, {}),
+        )
+        self._token_cache[session_id] = counts
+        return total
+
+    def _count_history_tokens(
+        self,
+        history: List[BaseMessage],
+        previous: dict[int, tuple[BaseMessage, int]],
+    ) -> Tuple[int, dict[int, tuple[BaseMessage, int]]]:
+        """Count tokens for ``history``, reusing counts from ``previous``.
+
+        Reads only its arguments, so it is safe to run in a worker thread
+        on a snapshot of the session.
+
+        Args:
+            history (List[BaseMessage]): Messages to count.
+            previous (dict[int, tuple[BaseMessage, int]]): Earlier per-message
+                counts keyed by message identity.
+
+        Returns:
+            Tuple[int, dict[int, tuple[BaseMessage, int]]]: The total and the
+                per-message counts for ``history``.
+        """
+        counts: dict[int, tuple[BaseMessage, int]] = {}
+        total = 0
+        for lc_msg in history:
+            entry = previous.get(id(lc_msg))
+            if entry is not None and entry[0] is lc_msg:
+                tokens = entry[1]
+            else:
+                tokens = estimate_message_tokens(self._to_app_message(lc_msg))
+            counts[id(lc_msg)] = (lc_msg, tokens)
+            total += tokens
+        return total, counts
+
     async def _rehydrate_session(self, session_id: str) -> Optional[List[BaseMessage]]:
         """Rehydrate a session's message history from the Platform DB.
 
@@ -411,6 +604,18 @@ class AgentService:
             [compaction_summary_msg] + [messages after firstKeptEntryId]
           - If no compaction has occurred, return all messages.
 
+        Disabled unless ``settings.SESSION_REHYDRATION_ENABLED`` is set.
+        Session IDs that the Platform reported as unknown are remembered for
+        ``settings.SESSION_TTL_SECONDS`` so repeated misses (e.g. a client
+        sending a bogus ID) short-circuit without another round-trip.
+
+        The compacted view is requested explicitly (``view=compacted``); a
+        Platform that supports it answers with
+        ``{"compaction_summary": str | None, "messages": [...]}`` and the
+        summary is restored as the leading ``[compaction]`` system message.
+        Older Platforms ignore the parameter and return the plain (paginated)
+        message list, which is accepted as-is.
+
         Args:
             session_id (str): The session to rehydrate from Platform DB.
 
@@ -418,15 +623,53 @@ class AgentService:
             Optional[List[BaseMessage]]: The rehydrated message list, or None
                 if the session does not exist in the Platform DB.
 
+        Raises:
+            httpx.HTTPError: If the Platform API is unreachable or returns an
+                error status (caller falls back to a fresh session).
+
         TODO:
-            - Implement Platform API client (httpx call to platform service)
-            - Map Platform Message records to LangChain BaseMessage
-            - Handle compaction entries (type="compaction" in Platform DB)
-            - Add error handling for Platform unavailability (graceful fallback)
             - Notify Platform after compaction runs (_compact_session) so
               compaction state is persisted and survives Agent restart
         """
-        return None
+        if not settings.SESSION_REHYDRATION_ENABLED:
+            return None
+        missing_at = self._missing_sessions.get(session_id)
+        if missing_at is not None and time.time() - missing_at < settings.SESSION_TTL_SECONDS:
+            return None
+
+        resp = await self._platform_client.get(
+            "/api/v1/messages/",
+            params={"session_id": session_id, "ordering": "created_at", "view": "compacted"},
+            timeout=settings.PLATFORM_API_TIMEOUT,
+        )
+        if resp.status_code == 404:
+            self._remember_missing_session(session_id)
+            return None
+        resp.raise_for_status()
+
+        data = resp.json()
+        summary: Optional[str] = None
+        if isinstance(data, dict):
+            summary = data.get("compaction_summary")
+            records = data.get("messages", data.get("results", []))
+        else:
+            records = data
+        history: List[BaseMessage] = []
+        if summary:
+            history.append(SystemMessage(content=f"{COMPACTION_PREFIX}\n{summary}"))
+        history.extend(m for m in map(_platform_record_to_lc, records) if m is not None)
+        if not history:
+            self._remember_missing_session(session_id)
+            return None
+        self._missing_sessions.pop(session_id, None)
+        return history
+
+    def _remember_missing_session(self, session_id: str) -> None:
+        """Record a Platform miss, keeping the negative cache bounded."""
+        self._missing_sessions.pop(session_id, None)
+        self._missing_sessions[session_id] = time.time()
+        if len(self._missing_sessions) > settings.MAX_SESSIONS:
+            del self._missing_sessions[next(iter(self._missing_sessions))]
 
     async def _get_or_create_session(
         self, session_id: Optional[str]
@@ -564,10 +807,10 @@ class AgentService:
         """Convert LangChain message -> app Message."""
         if isinstance(msg, HumanMessage):
             text = AgentService._extract_text(msg.content)
-            if text.startswith("[Tool result:"):
-                close = text.find("]")
-                label = text[len("[Tool result:"):close].strip() if close > 0 else None
-                body = text[close + 1:].lstrip() if close > 0 else text
+            if text.startswith(_TOOL_RESULT_PREFIX):
+                head, sep, body = text.partition("]")
+                label = head[len(_TOOL_RESULT_PREFIX):].strip() if sep else None
+                body = body.lstrip() if sep else text
                 return Message(
                     role=MessageRole.TOOL,
                     content=body,
@@ -575,13 +818,13 @@ class AgentService:
                 )
             return Message(role=MessageRole.USER, content=text)
         if isinstance(msg, AIMessage):
-            tc = getattr(msg, "tool_calls", None) or None
+            tc = msg.tool_calls or None
             if not tc:
-                tc = getattr(msg, "additional_kwargs", {}).get("synthetic_tool_calls")
-            usage = getattr(msg, "usage_metadata", None)
+                tc = msg.additional_kwargs.get("synthetic_tool_calls")
+            usage = msg.usage_metadata
             usage_dict = dict(usage) if isinstance(usage, dict) else None
             if usage_dict is None:
-                usage_dict = getattr(msg, "additional_kwargs", {}).get("synthetic_usage")
+                usage_dict = msg.additional_kwargs.get("synthetic_usage")
             return Message(
                 role=MessageRole.ASSISTANT,
                 content=AgentService._extract_text(msg.content),
@@ -594,13 +837,37 @@ class AgentService:
             return Message(
                 role=MessageRole.TOOL,
                 content=AgentService._extract_text(msg.content),
-                tool_call_id=getattr(msg, "tool_call_id", None),
+                tool_call_id=msg.tool_call_id,
             )
         return Message(
             role=MessageRole.USER,
-            content=AgentService._extract_text(getattr(msg, "content", "")),
+            content=AgentService._extract_text(msg.content),
         )
 
+    def _memo_lc_message(self, msg: Message) -> BaseMessage:
+        """Convert a request message, memoizing it until it is persisted.
+
+        The same request messages are sent to the LLM (possibly several times
+        across retries) and then appended to history; memoizing by identity
+        converts each one once and stores the very object that was sent.
+        """
+        entry = self._lc_memo.get(id(msg))
+        if entry is not None and entry[0] is msg:
+            return entry[1]
+        lc_msg = self._to_lc_message(msg)
+        if len(self._lc_memo) >= _LC_MEMO_MAX:
+            # Requests that failed before persisting never release entries.
+            self._lc_memo.clear()
+        self._lc_memo[id(msg)] = (msg, lc_msg)
+        return lc_msg
+
+    def _take_lc_message(self, msg: Message) -> BaseMessage:
+        """Return and release the memoized conversion of a message being persisted."""
+        entry = self._lc_memo.pop(id(msg), None)
+        if entry is not None and entry[0] is msg:
+            return entry[1]
+        return self._to_lc_message(msg)
+
     def _ensure_lc_session(self, session_id: str) -> None:
         """Ensure an LC history list exists for a session."""
         if session_id in self._lc_sessions:
@@ -656,10 +923,12 @@ class AgentService:
     @staticmethod
     def _preview_text(content: Any, limit: int = 220) -> str:
         """Render message content as a short single-line preview."""
-        text = AgentService._extract_text(content).replace("\n", "\\n")
+        text = AgentService._extract_text(content)
         if len(text) <= limit:
-            return text
-        return f"{text[:limit]}...(truncated {len(text) - limit} chars)"
+            return text.replace("\n", "\\n")
+        # Escape only the head we keep; the tail would be discarded anyway.
+        head = text[:limit].replace("\n", "\\n")
+        return f"{head}...(truncated {len(text) - limit} chars)"
 
     @staticmethod
     def _summarize_tool_calls(tool_calls: Any) -> list[dict[str, Any]]:
@@ -701,17 +970,17 @@ class AgentService:
                 item["role"] = "user"
             elif isinstance(msg, ToolMessage):
                 item["role"] = "tool"
-                item["tool_call_id"] = getattr(msg, "tool_call_id", None)
-                item["status"] = getattr(msg, "status", None)
+                item["tool_call_id"] = msg.tool_call_id
+                item["status"] = msg.status
             elif isinstance(msg, AIMessage):
                 item["role"] = "assistant"
-                tool_calls = getattr(msg, "tool_calls", None) or []
+                tool_calls = msg.tool_calls
                 if tool_calls:
                     item["tool_calls"] = self._summarize_tool_calls(tool_calls)
-                invalid_calls = getattr(msg, "invalid_tool_calls", None) or []
+                invalid_calls = msg.invalid_tool_calls
                 if invalid_calls:
                     item["invalid_tool_calls_count"] = len(invalid_calls)
-                usage = getattr(msg, "usage_metadata", None)
+                usage = msg.usage_metadata
                 if isinstance(usage, dict):
                     item["usage"] = {
                         "input_tokens": usage.get("input_tokens"),
@@ -744,10 +1013,16 @@ class AgentService:
         lc_messages: list[BaseMessage],
         tools: list,
     ) -> None:
-        """Log message history right before each LLM invocation."""
+        """Log message history right before each LLM invocation.
+
+        Serializing the whole history is only worth it when the record is
+        actually emitted, so this is a no-op unless DEBUG is enabled.
+        """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         try:
             payload = self._serialize_lc_history_for_log(lc_messages)
-            logger.warning(
+            logger.debug(
                 "LLM_PRECALL_HISTORY stage=%s session=%s tool_schema_count=%d message_count=%d payload=%s",
                 stage,
                 session_id,
@@ -775,16 +1050,55 @@ class AgentService:
             instructions (Optional[str]): Extra instructions to append
                 inside an ``<instructions>`` XML block.
 
+        The tool sections and instructions are cached per
+        ``(tool_names, instructions, mcp_tools_version)``; only the identity
+        header (which carries the current datetime) is rebuilt per call.
+
         Returns:
             str: The assembled system prompt string.
         """
-        prompt = build_system_prompt(
-            tool_names=tool_names,
-            mcp_tools=self.mcp_tools,
-        )
-        if instructions:
-            prompt += f"\n\n<instructions>\n{instructions}\n</instructions>"
-        return prompt
+        key = (tuple(tool_names), instructions, self._mcp_tools_version)
+        suffix = self._sys_prompt_cache.get(key)
+        if suffix is None:
+            tools_prompt = build_tools_prompt(tool_names, self.mcp_tools)
+            suffix = f"\n{tools_prompt}" if tools_prompt else ""
+            if instructions:
+                suffix += f"\n\n<instructions>\n{instructions}\n</instructions>"
+            if len(self._sys_prompt_cache) >= _SYS_PROMPT_CACHE_MAX:
+                # Instructions are caller-supplied; keep the cache bounded.
+                self._sys_prompt_cache.clear()
+            self._sys_prompt_cache[key] = suffix
+        return build_identity_prompt() + suffix
+
+    def _make_system_message(
+        self,
+        tool_names: List[str],
+        instructions: Optional[str] = None,
+    ) -> SystemMessage:
+        """Return the system prompt wrapped in a (possibly shared) SystemMessage.
+
+        The prompt text only changes when its datetime stamp ticks over or
+        the cache key changes, so calls in between reuse the previous
+        message instead of validating a new model around the same
+        multi-kilobyte string.
+
+        Args:
+            tool_names (List[str]): Names of tools available to the agent.
+            instructions (Optional[str]): Extra instructions for the prompt.
+
+        Returns:
+            SystemMessage: Message carrying the current system prompt.
+        """
+        prompt = self._make_system_prompt(tool_names, instructions)
+        key = (tuple(tool_names), instructions, self._mcp_tools_version)
+        cached = self._sys_message_cache.get(key)
+        if cached is not None and cached.content == prompt:
+            return cached
+        message = SystemMessage(content=prompt)
+        if len(self._sys_message_cache) >= _SYS_PROMPT_CACHE_MAX:
+            self._sys_message_cache.clear()
+        self._sys_message_cache[key] = message
+        return message
 
     def _build_lc_messages(
         self,
@@ -807,23 +1121,71 @@ class AgentService:
         Returns:
             list: Ordered list of LangChain message objects.
         """
-        lc_messages = [SystemMessage(content=self._make_system_prompt(tool_names, instructions))]
+        lc_messages = [self._make_system_message(tool_names, instructions)]
         lc_messages.extend(self._to_lc_message(msg) for msg in history)
         lc_messages.extend(self._to_lc_message(msg) for msg in new_messages)
         return lc_messages
 
+    def _build_request_messages(
+        self,
+        session_id: str,
+        tool_names: List[str],
+        instructions: Optional[str],
+        lc_new_messages: List[BaseMessage],
+    ) -> List[BaseMessage]:
+        """Build the request list [system] + [session history] + [new] once per call.
+
+        Args:
+            session_id (str): Session whose stored LC history is included.
+            tool_names (List[str]): Tool names for system prompt generation.
+            instructions (Optional[str]): Extra instructions for the prompt.
+            lc_new_messages (List[BaseMessage]): Converted request messages.
+
+        Returns:
+            List[BaseMessage]: The message list to send to the LLM.
+        """
+        self._ensure_lc_session(session_id)
+        lc_messages: List[BaseMessage] = [self._make_system_message(tool_names, instructions)]
+        lc_messages.extend(self._lc_sessions[session_id])
+        lc_messages.extend(lc_new_messages)
+        return lc_messages
+
+    def _splice_session_history(
+        self,
+        lc_messages: List[BaseMessage],
+        session_id: str,
+        new_count: int,
+    ) -> None:
+        """Replace the history region of a built request after overflow recovery.
+
+        The system message and the trailing ``new_count`` request messages
+        are left in place; only the session history between them is swapped
+        for the recovered one.
+        """
+        self._ensure_lc_session(session_id)
+        lc_messages[1:len(lc_messages) - new_count] = self._lc_sessions[session_id]
+
     def _resolve_tool_schemas(self, tool_names: List[str]) -> list:
         """Resolve tool names to OpenAI function-calling schemas.
 
         Args:
             tool_names (List[str]): Names of tools to look up.
 
+        The result is cached per ``(tool_names, mcp_tools_version)`` and
+        shared between calls, so callers must not mutate it.
+
         Returns:
             list: OpenAI-compatible function-calling schema dicts.
         """
-        schemas = [TOOL_SCHEMA_MAP[n] for n in tool_names if n in TOOL_SCHEMA_MAP]
-        if self.mcp_tools:
-            schemas.extend(self.mcp_tools)
+        key = (tuple(tool_names), self._mcp_tools_version)
+        schemas = self._tool_schema_cache.get(key)
+        if schemas is None:
+            schemas = [TOOL_SCHEMA_MAP[n] for n in tool_names if n in TOOL_SCHEMA_MAP]
+            if self.mcp_tools:
+                schemas.extend(self.mcp_tools)
+            if len(self._tool_schema_cache) >= _TOOL_SCHEMA_CACHE_MAX:
+                self._tool_schema_cache.clear()
+            self._tool_schema_cache[key] = schemas
         return schemas
 
     async def _call_llm(self, lc_messages: list, tools: list):
@@ -840,6 +1202,57 @@ class AgentService:
             return await self.llm.bind_tools(tools).ainvoke(lc_messages)
         return await self.llm.ainvoke(lc_messages)
 
+    async def _race_fallbacks(
+        self,
+        session_id: str,
+        attempts: List[Tuple[str, List[BaseMessage]]],
+    ):
+        """Run tool-less fallback calls concurrently; first success wins.
+
+        Remaining calls are cancelled once one succeeds. When several finish
+        together, the earliest attempt in ``attempts`` is preferred.
+
+        Args:
+            session_id (str): Active session identifier (for logging).
+            attempts (List[Tuple[str, List[BaseMessage]]]): ``(stage,
+                lc_messages)`` pairs, in order of preference.
+
+        Returns:
+            AIMessage: The first successful LLM response.
+
+        Raises:
+            Exception: The last error seen if every attempt fails.
+        """
+        tasks = []
+        for stage, lc_messages in attempts:
+            self._log_pre_llm_history(
+                stage=stage,
+                session_id=session_id,
+                lc_messages=lc_messages,
+                tools=[],
+            )
+            tasks.append(asyncio.create_task(self._call_llm(lc_messages, [])))
+
+        pending = set(tasks)
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task not in done:
+                        continue
+                    err = task.exception()
+                    if err is None:
+                        return task.result()
+                    last_error = err
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        # ``attempts`` is never empty, so at least one error was recorded.
+        raise last_error  # type: ignore[misc]
+
     async def _call_llm_stream(self, lc_messages: list, tools: list):
         """Stream LLM response chunks, optionally with tool binding.
 
@@ -873,7 +1286,10 @@ class AgentService:
                 ``self.sessions``).
         """
         history = self.get_history(session_id)
-        original_lc = list(self._lc_sessions.get(session_id, []))
+        # No copy: only the kept tail is read back, bounded by the length at
+        # entry so messages appended meanwhile are not mistaken for it.
+        original_lc = self._lc_sessions.get(session_id, [])
+        original_len = len(original_lc)
         s = self.compaction_settings
 
         history, truncated = truncate_oversized_tool_results(history, s)
@@ -888,22 +1304,21 @@ class AgentService:
         # The compacted history starts with a [compaction] summary system
         # message, followed by the kept tail from the original history.
         lc_result: List[BaseMessage] = []
-        original_len = len(original_lc)
-        kept_tail_len = 0
+        non_summary: List[Message] = []
+        system_role = MessageRole.SYSTEM
         for msg in history:
-            if msg.role == MessageRole.SYSTEM and msg.content.startswith("[compaction]"):
+            if msg.role == system_role and msg.content.startswith(COMPACTION_PREFIX):
                 lc_result.append(self._to_lc_message(msg))
             else:
-                kept_tail_len += 1
+                non_summary.append(msg)
+        kept_tail_len = len(non_summary)
 
         # The kept tail is the last N messages from the original LC history.
-        if kept_tail_len > 0 and kept_tail_len <= original_len:
-            lc_result.extend(original_lc[original_len - kept_tail_len:])
+        if 0 < kept_tail_len <= original_len:
+            lc_result.extend(original_lc[original_len - kept_tail_len:original_len])
         else:
             # Fallback: convert all non-summary messages
-            for msg in history:
-                if not (msg.role == MessageRole.SYSTEM and msg.content.startswith("[compaction]")):
-                    lc_result.append(self._to_lc_message(msg))
+            lc_result.extend(self._to_lc_message(msg) for msg in non_summary)
 
         self._lc_sessions[session_id] = lc_result
         return history
@@ -938,9 +1353,7 @@ class AgentService:
                 overflow_retries + 1,
                 settings.MAX_OVERFLOW_RETRIES,
             )
-            before_tokens = estimate_messages_tokens(
-                self.get_history(session_id),
-            )
+            before_tokens = self._estimate_session_tokens(session_id)
             try:
                 history = await self._compact_session(session_id)
             except Exception as compact_err:
@@ -979,11 +1392,18 @@ class AgentService:
                 50_000,
             ),
         )
-        history, truncated = truncate_oversized_tool_results(
+        truncated_history, truncated = truncate_oversized_tool_results(
             history,
             aggressive_settings,
         )
-        self._lc_sessions[session_id] = [self._to_lc_message(m) for m in history]
+        # Positions are unchanged, so only the truncated entries are
+        # replaced in place; every other LC message keeps its identity
+        # (and provider metadata) instead of being re-converted.
+        lc_history = self._lc_sessions[session_id]
+        for i, msg in enumerate(truncated_history):
+            if msg is not history[i]:
+                lc_history[i] = self._to_lc_message(msg)
+        history = truncated_history
         truncation_attempted = True
         if truncated:
             logger.info(
@@ -1004,7 +1424,9 @@ class AgentService:
 
         Uses actual ``input_tokens`` from the last assistant message in
         history when available (post-turn check). Falls back to tiktoken
-        estimation on the first call when no usage data exists yet.
+        estimation on the first call when no usage data exists yet; that
+        estimate runs in a worker thread so tokenizing a large (e.g.
+        rehydrated) history does not stall other sessions on the event loop.
 
         Args:
             session_id (str): The session to check.
@@ -1015,8 +1437,16 @@ class AgentService:
         if last_tokens is not None:
             ratio = last_tokens / ctx_tokens if ctx_tokens > 0 else 0.0
         else:
-            session_history = self.get_history(session_id)
-            est_tokens = estimate_messages_tokens(session_history + new_messages)
+            # Count a snapshot off-loop; the cache is written back here on
+            # the loop, and only if the session was not evicted meanwhile.
+            history_tokens, counts = await asyncio.to_thread(
+                self._count_history_tokens,
+                list(self._lc_sessions.get(session_id, [])),
+                self._token_cache.get(session_id, {}),
+            )
+            if session_id in self._lc_sessions:
+                self._token_cache[session_id] = counts
+            est_tokens = history_tokens + estimate_messages_tokens(new_messages)
             ratio = est_tokens / ctx_tokens if ctx_tokens > 0 else 0.0
         if ratio >= self.compaction_settings.proactive_pruning_ratio:
             logger.info(
@@ -1065,23 +1495,19 @@ class AgentService:
             )
 
         tools = self._resolve_tool_schemas(tool_names) if use_tools else []
-        lc_new_messages = [self._to_lc_message(msg) for msg in new_messages]
+        lc_new_messages = [self._memo_lc_message(msg) for msg in new_messages]
         overflow_retries = 0
         truncation_attempted = False
-        proactive_done = False
         llm_retries = 0
 
-        while True:
-            # Proactive pruning: compact before the LLM call when context
-            # usage is high, avoiding a wasted overflow round-trip.
-            if not proactive_done:
-                await self._maybe_proactive_compact(session_id, new_messages)
-                proactive_done = True
+        # Proactive pruning: compact before the LLM call when context
+        # usage is high, avoiding a wasted overflow round-trip.
+        await self._maybe_proactive_compact(session_id, new_messages)
 
-            self._ensure_lc_session(session_id)
-            lc_messages = [SystemMessage(content=self._make_system_prompt(tool_names, instructions))]
-            lc_messages.extend(self._lc_sessions.get(session_id, []))
-            lc_messages.extend(lc_new_messages)
+        lc_messages = self._build_request_messages(
+            session_id, tool_names, instructions, lc_new_messages,
+        )
+        while True:
             try:
                 self._log_pre_llm_history(
                     stage="primary",
@@ -1104,6 +1530,7 @@ class AgentService:
                     )
                     if not recovered:
                         raise
+                    self._splice_session_history(lc_messages, session_id, len(lc_new_messages))
                     continue
 
                 if _is_retryable_error(e) and not _is_thought_signature_error(e) and llm_retries < settings.MAX_LLM_RETRIES:
@@ -1119,6 +1546,23 @@ class AgentService:
                     await asyncio.sleep(delay)
                     continue
 
+                if settings.LLM_PARALLEL_FALLBACKS:
+                    clean, changed = _strip_tool_messages(lc_messages)
+                    attempts: List[Tuple[str, List[BaseMessage]]] = []
+                    if tools:
+                        attempts.append(("fallback_no_tools", lc_messages))
+                    if changed:
+                        attempts.append(("fallback_stripped_tool_messages", clean))
+                    if attempts:
+                        logger.warning(
+                            "LLM call failed; racing %d fallback(s): %s", len(attempts), e,
+                        )
+                        try:
+                            return await self._race_fallbacks(session_id, attempts)
+                        except Exception as fallback_err:
+                            logger.warning("All fallbacks failed: %s", fallback_err)
+                    raise
+
                 # Fallback 1: retry without tools (same history).
                 if tools:
                     logger.warning(
@@ -1169,19 +1613,20 @@ class AgentService:
             messages (List[Message]): User/tool messages to append.
             response_text (str): The assistant's text response to append.
             usage (Optional[Dict[str, Any]]): Token usage for this LLM call.
+                Only used when ``assistant_lc_message`` is not given.
+            assistant_lc_message (Optional[BaseMessage]): The original LLM
+                response, stored as-is (it already carries usage metadata).
         """
         self._ensure_lc_session(session_id)
         lc_history = self._lc_sessions[session_id]
-        lc_history.extend(self._to_lc_message(msg) for msg in messages)
+        lc_history.extend(self._take_lc_message(msg) for msg in messages)
         if assistant_lc_message is not None:
             lc_history.append(assistant_lc_message)
             return
-        usage_metadata = usage or None
-        usage_metadata = _normalize_usage_metadata(usage)
         lc_history.append(
             AIMessage(
                 content=response_text,
-                usage_metadata=usage_metadata,  # type: ignore[arg-type]
+                usage_metadata=_normalize_usage_metadata(usage),  # type: ignore[arg-type]
             )
         )
 
@@ -1226,16 +1671,23 @@ class AgentService:
             self._session_last_access[session_id] = time.time()
 
             # Check if any new tool result contains a fresh page snapshot.
+            # Browser page tools are taken at their name; only other results
+            # need a content scan. A browser error without a page is harmless
+            # here, as invalidation always keeps the latest real snapshot.
             has_new_page = any(
-                _is_browser_page_content(tr.content)
+                tr.tool_name in _BROWSER_PAGE_TOOLS or _is_browser_page_content(tr.content)
                 for tr in tool_results
-                if tr.tool_name in _BROWSER_PAGE_TOOLS or _is_browser_page_content(tr.content)
             )
 
-            lc_history.extend(self._to_lc_message(msg) for msg in messages)
+            lc_history.extend(self._take_lc_message(msg) for msg in messages)
             if assistant_lc_message is not None:
                 lc_history.append(assistant_lc_message)
-                lc_history.extend(self._to_lc_message(msg) for msg in tool_results)
+                index = self._tool_call_index.setdefault(session_id, {})
+                for msg in tool_results:
+                    lc_msg = self._to_lc_message(msg)
+                    if isinstance(lc_msg, ToolMessage):
+                        index[lc_msg.tool_call_id] = len(lc_history)
+                    lc_history.append(lc_msg)
             else:
                 # Synthetic fallback: convert to plain text to avoid
                 # Gemini thought-signature validation failures.
@@ -1260,7 +1712,17 @@ class AgentService:
             # Invalidate stale browser page snapshots now that the new
             # results (including the latest page) are in history.
             if has_new_page:
-                n = _invalidate_stale_browser_results(lc_history)
+                # Snapshots before the one kept last time were already
+                # replaced, so only the messages from there on are scanned.
+                start = 0
+                hint = self._page_snapshot_hint.get(session_id)
+                if hint is not None:
+                    pos, kept = hint
+                    if pos < len(lc_history) and lc_history[pos] is kept:
+                        start = pos
+                n, latest = _invalidate_stale_browser_results(lc_history, start)
+                if latest >= 0:
+                    self._page_snapshot_hint[session_id] = (latest, lc_history[latest])
                 if n:
                     logger.info("Invalidated %d stale browser page snapshot(s)", n)
 
@@ -1271,17 +1733,37 @@ class AgentService:
         output: str,
         tool_name: Optional[str] = None,
     ) -> bool:
-        """Replace a placeholder tool result in LC history."""
-        matched = False
+        """Replace a placeholder tool result in LC history.
 
+        Looks up the position recorded by ``append_tool_interaction`` first
+        and only falls back to a linear scan when the hint is missing or
+        stale.
+        """
         self._ensure_lc_session(session_id)
         lc_history = self._lc_sessions.get(session_id, [])
-        for i, h in enumerate(lc_history):
-            if isinstance(h, ToolMessage) and getattr(h, "tool_call_id", None) == tool_call_id:
-                lc_history[i] = ToolMessage(content=output, tool_call_id=tool_call_id)
-                matched = True
-                break
-        return matched
+        index = self._tool_call_index.setdefault(session_id, {})
+
+        i = index.get(tool_call_id)
+        if i is None or not (
+            i < len(lc_history)
+            and isinstance(lc_history[i], ToolMessage)
+            and lc_history[i].tool_call_id == tool_call_id
+        ):
+            i = next(
+                (
+                    j
+                    for j, h in enumerate(lc_history)
+                    if isinstance(h, ToolMessage) and h.tool_call_id == tool_call_id
+                ),
+                None,
+            )
+            if i is None:
+                index.pop(tool_call_id, None)
+                return False
+            index[tool_call_id] = i
+
+        lc_history[i] = ToolMessage(content=output, tool_call_id=tool_call_id)
+        return True
 
     async def process_messages(
         self,
@@ -1321,7 +1803,6 @@ class AgentService:
                 session_id,
                 messages,
                 response_text,
-                usage=usage.model_dump(),
                 assistant_lc_message=response,
             )
 
@@ -1377,7 +1858,6 @@ class AgentService:
                 session_id,
                 messages,
                 response_text,
-                usage=usage.model_dump(),
                 assistant_lc_message=response,
             )
 
@@ -1413,18 +1893,14 @@ class AgentService:
         """
         session_id = await self._ensure_session(session_id)
         tools = self._resolve_tool_schemas(tool_names) if use_tools else []
-        lc_new = [self._to_lc_message(msg) for msg in messages]
+        lc_new = [self._memo_lc_message(msg) for msg in messages]
         overflow_retries = 0
         truncation_attempted = False
 
         await self._maybe_proactive_compact(session_id, messages)
 
+        lc_messages = self._build_request_messages(session_id, tool_names, instructions, lc_new)
         while True:
-            self._ensure_lc_session(session_id)
-            lc_messages = [SystemMessage(content=self._make_system_prompt(tool_names, instructions))]
-            lc_messages.extend(self._lc_sessions.get(session_id, []))
-            lc_messages.extend(lc_new)
-
             try:
                 self._log_pre_llm_history(
                     stage="stream_primary",
@@ -1446,5 +1922,6 @@ class AgentService:
                         session_id, overflow_retries, truncation_attempted
                     )
                     if recovered:
+                        self._splice_session_history(lc_messages, session_id, len(lc_new))
                         continue
                 raise
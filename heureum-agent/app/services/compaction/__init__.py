@@ -60,11 +60,13 @@ from app.services.compaction.summarizer import (
     summarize_with_fallback,
 )
 from app.services.compaction.tokens import (
+    estimate_content_tokens,
     estimate_context_chars,
     estimate_message_chars,
     estimate_message_tokens,
     estimate_messages_tokens,
     estimate_tokens,
+    estimate_tokens_batch,
 )
 from app.services.compaction.truncation import (
     calculate_max_tool_result_chars,
@@ -78,6 +80,8 @@ __all__ = [
     "SoftTrimConfig",
     "HardClearConfig",
     "estimate_tokens",
+    "estimate_tokens_batch",
+    "estimate_content_tokens",
     "estimate_message_tokens",
     "estimate_messages_tokens",
     "estimate_message_chars",
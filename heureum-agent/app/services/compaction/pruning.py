@@ -31,8 +31,12 @@ Limitation — tool name filtering:
 from __future__ import annotations
 
 import fnmatch
+import functools
 import logging
-from typing import List, Optional
+import math
+import re
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
 
 from app.models import Message
 from app.schemas.open_responses import MessageRole
@@ -41,7 +45,25 @@ from app.services.compaction.tokens import estimate_message_chars
 
 logger = logging.getLogger(__name__)
 
-_TOOL_ROLES = frozenset({MessageRole.TOOL})
+_SOFT_TRIM_SEPARATOR = "\n...\n"
+_SOFT_TRIM_NOTE = "\n\n[Tool result trimmed: kept first {} and last {} chars of {} chars.]"
+# Characters a soft trim adds besides the kept text and the three numbers.
+_SOFT_TRIM_FIXED_CHARS = len(_SOFT_TRIM_SEPARATOR) + len(_SOFT_TRIM_NOTE) - len("{}") * 3
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_patterns(patterns: Tuple[str, ...]) -> Callable[[str], Optional[re.Match]]:
+    """Compile glob patterns into one case-normalised regex matcher.
+
+    Args:
+        patterns (Tuple[str, ...]): ``fnmatch`` glob patterns.
+
+    Returns:
+        Callable[[str], Optional[re.Match]]: ``match`` of the combined
+            regex; truthy when the (lower-cased) name matches any pattern.
+    """
+    combined = "|".join(fnmatch.translate(p.strip().lower()) for p in patterns)
+    return re.compile(combined).match
 
 
 def _is_tool_prunable(tool_name: Optional[str], config: ToolPruningConfig) -> bool:
@@ -62,16 +84,11 @@ def _is_tool_prunable(tool_name: Optional[str], config: ToolPruningConfig) -> bo
 
     name = (tool_name or "").strip().lower()
 
-    if config.deny:
-        for pattern in config.deny:
-            if fnmatch.fnmatch(name, pattern.strip().lower()):
-                return False
+    if config.deny and _compile_patterns(tuple(config.deny))(name):
+        return False
 
     if config.allow:
-        for pattern in config.allow:
-            if fnmatch.fnmatch(name, pattern.strip().lower()):
-                return True
-        return False
+        return _compile_patterns(tuple(config.allow))(name) is not None
 
     return True
 
@@ -100,7 +117,7 @@ def _find_assistant_cutoff_index(
 
     remaining = keep_last_assistants
     for i in range(len(messages) - 1, -1, -1):
-        if messages[i].role == MessageRole.ASSISTANT:
+        if messages[i].role is MessageRole.ASSISTANT:
             remaining -= 1
             if remaining == 0:
                 return i
@@ -120,7 +137,7 @@ def _find_first_user_index(messages: List[Message]) -> Optional[int]:
             or ``None`` if no user message exists.
     """
     for i, msg in enumerate(messages):
-        if msg.role == MessageRole.USER:
+        if msg.role is MessageRole.USER:
             return i
     return None
 
@@ -141,13 +158,39 @@ def _soft_trim_content(
         str: Trimmed text with head, ellipsis separator, tail, and an
             informational note about the trimming.
     """
-    head = text[:head_chars]
     tail = text[-tail_chars:] if tail_chars > 0 else ""
-    note = (
-        f"\n\n[Tool result trimmed: kept first {head_chars} "
-        f"and last {tail_chars} chars of {len(text)} chars.]"
+    # str.join sizes the result first, so the (large) output is allocated
+    # once; only the head/tail slices and the short note are temporaries.
+    return "".join(
+        (
+            text[:head_chars],
+            _SOFT_TRIM_SEPARATOR,
+            tail,
+            _SOFT_TRIM_NOTE.format(head_chars, tail_chars, len(text)),
+        )
+    )
+
+
+def _soft_trimmed_length(length: int, head_chars: int, tail_chars: int) -> int:
+    """Length of ``_soft_trim_content`` output, computed without building it.
+
+    Args:
+        length (int): Length of the original text.
+        head_chars (int): Number of characters kept from the beginning.
+        tail_chars (int): Number of characters kept from the end.
+
+    Returns:
+        int: Character count of the trimmed text including the note.
+    """
+    kept_tail = min(tail_chars, length) if tail_chars > 0 else 0
+    return (
+        min(head_chars, length)
+        + kept_tail
+        + _SOFT_TRIM_FIXED_CHARS
+        + len(str(head_chars))
+        + len(str(tail_chars))
+        + len(str(length))
     )
-    return f"{head}\n...\n{tail}{note}"
 
 
 def _soft_trim_message(
@@ -170,11 +213,19 @@ def _soft_trim_message(
 
     head = settings.soft_trim.head_chars
     tail = settings.soft_trim.tail_chars
-    if head + tail >= len(msg.content):
+    length = len(msg.content)
+    if head + tail >= length:
+        return None
+    # Near the threshold the note can outweigh what is cut; don't allocate
+    # a "trimmed" copy that is no shorter than the original.
+    if _soft_trimmed_length(length, head, tail) >= length:
         return None
 
     trimmed = _soft_trim_content(msg.content, head, tail)
-    return Message(role=msg.role, content=trimmed, tool_call_id=msg.tool_call_id, tool_name=msg.tool_name)
+    # Fields are copied from an already-validated Message.
+    return Message.model_construct(
+        role=msg.role, content=trimmed, tool_call_id=msg.tool_call_id, tool_name=msg.tool_name
+    )
 
 
 def _estimate_chars(msg: Message) -> int:
@@ -192,18 +243,6 @@ def _estimate_chars(msg: Message) -> int:
     return estimate_message_chars(msg)
 
 
-def _total_chars(messages: List[Message]) -> int:
-    """Compute total character count across all messages including tool_calls.
-
-    Args:
-        messages (List[Message]): Messages to measure.
-
-    Returns:
-        int: Sum of character counts of all messages (content + tool_calls).
-    """
-    return sum(estimate_message_chars(m) for m in messages)
-
-
 def prune_context_messages(
     messages: List[Message],
     settings: CompactionSettings,
@@ -213,7 +252,8 @@ def prune_context_messages(
     Phase 1 — soft trim (ratio >= soft_trim_ratio):
         Truncate old tool results to head + tail.
     Phase 2 — hard clear (ratio >= hard_clear_ratio):
-        Replace old tool results with a short placeholder.
+        Replace old tool results with a short placeholder until the ratio
+        is ``hard_clear_overshoot`` below ``hard_clear_ratio``.
 
     Recent assistant messages (keep_last_assistants) and messages before the
     first user message are always protected.
@@ -235,24 +275,66 @@ def prune_context_messages(
     if char_window <= 0:
         return messages
 
-    cutoff_index = _find_assistant_cutoff_index(messages, settings.keep_last_assistants)
-    first_user = _find_first_user_index(messages)
-    prune_start = first_user if first_user is not None else 0
-
-    total = _total_chars(messages)
-    ratio = total / char_window
+    # Only tool results are ever rewritten, so a history without any (the
+    # usual shape of a fresh conversation) is returned as-is without
+    # measuring a single message.
+    tool_role = MessageRole.TOOL
+    if not any(m.role is tool_role for m in messages):
+        return messages
 
-    if ratio < settings.soft_trim_ratio:
+    # Per-index character counts, measured once and kept in step with each
+    # rewrite so no message is ever re-measured.  Whether the budget is
+    # exceeded is only known once every message is measured, so this pass
+    # is unavoidable -- but it is all an under-budget history pays for.
+    chars = [estimate_message_chars(m) for m in messages]
+    total = sum(chars)
+
+    # Ratio thresholds as absolute char counts.  ``total`` is an integer,
+    # so ``total < ceil(r * window)`` is exactly ``total / window < r``.
+    soft_trim_chars = math.ceil(settings.soft_trim_ratio * char_window)
+    if total < soft_trim_chars:
         return messages
 
+    hard_clear_chars = math.ceil(settings.hard_clear_ratio * char_window)
+    hard_clear = settings.hard_clear
+
+    # Over budget: one forward scan finds the first user message and the
+    # last ``keep_last_assistants`` assistant positions (equivalent to
+    # _find_first_user_index / _find_assistant_cutoff_index).
+    keep = settings.keep_last_assistants
+    first_user: Optional[int] = None
+    recent_assistants: deque[int] = deque(maxlen=max(keep, 0))
+    user_role = MessageRole.USER
+    assistant_role = MessageRole.ASSISTANT
+    for i, msg in enumerate(messages):
+        role = msg.role
+        if role is assistant_role:
+            recent_assistants.append(i)
+        elif role is user_role and first_user is None:
+            first_user = i
+
+    if keep <= 0:
+        cutoff_index = len(messages)
+    elif len(recent_assistants) == keep:
+        cutoff_index = recent_assistants[0]
+    else:
+        # Fewer than keep_last_assistants exist; all are in the tail.
+        cutoff_index = 0
+    prune_start = first_user if first_user is not None else 0
+
     prunable_indices: List[int] = []
-    result: Optional[List[Message]] = None
+    # Rewritten messages by index; the output list is only built once, at
+    # the end, and only if anything changed.
+    overrides: Dict[int, Message] = {}
+    tool_pruning = settings.tool_pruning
+    # The default config (no allow/deny lists) makes every tool prunable.
+    filter_tools = bool(tool_pruning.deny or tool_pruning.allow)
 
     for i in range(prune_start, cutoff_index):
         msg = messages[i]
-        if msg.role not in _TOOL_ROLES:
+        if msg.role is not tool_role:
             continue
-        if not _is_tool_prunable(msg.tool_name, settings.tool_pruning):
+        if filter_tools and not _is_tool_prunable(msg.tool_name, tool_pruning):
             continue
         prunable_indices.append(i)
 
@@ -260,48 +342,46 @@ def prune_context_messages(
         if trimmed is None:
             continue
 
-        before = _estimate_chars(msg)
         after = _estimate_chars(trimmed)
-        total += after - before
-
-        if result is None:
-            result = list(messages)
-        result[i] = trimmed
-
-    output_after_soft = result if result is not None else messages
-    ratio = total / char_window
-
-    if ratio < settings.hard_clear_ratio:
-        return output_after_soft
-
-    if not settings.hard_clear.enabled:
-        return output_after_soft
-
-    prunable_chars = sum(
-        _estimate_chars(output_after_soft[i])
-        for i in prunable_indices
-        if output_after_soft[i].role in _TOOL_ROLES
-    )
-    if prunable_chars < settings.min_prunable_tool_chars:
-        return output_after_soft
-
-    for i in prunable_indices:
-        if ratio < settings.hard_clear_ratio:
-            break
-
-        msg = output_after_soft[i]
-        if msg.role not in _TOOL_ROLES:
-            continue
-
-        before = _estimate_chars(msg)
-        cleared = Message(role=msg.role, content=settings.hard_clear.placeholder, tool_call_id=msg.tool_call_id, tool_name=msg.tool_name)
-
-        if result is None:
-            result = list(messages)
-        result[i] = cleared
-
-        after = _estimate_chars(cleared)
-        total += after - before
-        ratio = total / char_window
-
-    return result if result is not None else messages
+        total += after - chars[i]
+        chars[i] = after
+        overrides[i] = trimmed
+
+    if (
+        total >= hard_clear_chars
+        and hard_clear.enabled
+        and sum(chars[i] for i in prunable_indices) >= settings.min_prunable_tool_chars
+    ):
+        placeholder = hard_clear.placeholder
+        # Clear past the trigger point: the next clears then only happen
+        # after the conversation has grown by the overshoot, and extend the
+        # already-cleared prefix instead of moving the first changed
+        # message (and with it the provider's prompt-cache hit) every call.
+        clear_target_ratio = max(settings.hard_clear_ratio - settings.hard_clear_overshoot, 0.0)
+        clear_target_chars = min(hard_clear_chars, math.ceil(clear_target_ratio * char_window))
+        # Every cleared message has the same size; measure the first only.
+        cleared_chars: Optional[int] = None
+        for i in prunable_indices:
+            if total < clear_target_chars:
+                break
+
+            msg = overrides.get(i, messages[i])
+            cleared = Message.model_construct(
+                role=msg.role,
+                content=placeholder,
+                tool_call_id=msg.tool_call_id,
+                tool_name=msg.tool_name,
+            )
+            overrides[i] = cleared
+
+            if cleared_chars is None:
+                cleared_chars = _estimate_chars(cleared)
+            total += cleared_chars - chars[i]
+            chars[i] = cleared_chars
+
+    if not overrides:
+        return messages
+    result = list(messages)
+    for i, msg in overrides.items():
+        result[i] = msg
+    return result
@@ -10,18 +10,9 @@ with "unexpected tool_use_id" errors.
 
 This module detects and removes orphaned tool_results.
 
-Prerequisites (Message model):
-  The current Message(role, content) model lacks tool-calling fields.
-  For this module to function, Message needs:
-
-    class Message(BaseModel):
-        role: str
-        content: str
-        tool_call_id: Optional[str] = None   # tool role: ID of the tool_use being responded to
-        tool_calls: Optional[List[dict]] = None  # assistant role: list of tool_use blocks with 'id' key
-
-  Until those fields are added, this module is a safe no-op (returns
-  messages unchanged).
+Pairing relies on ``Message.tool_calls`` (assistant role: tool_use blocks
+with an ``id`` key) and ``Message.tool_call_id`` (tool role: the tool_use
+being responded to).  Tool results without an ID are never dropped.
 
 Reference: OpenClaw repairToolUseResultPairing (compaction.ts:340-358)
 """
@@ -55,11 +46,8 @@ class RepairReport:
 def repair_tool_use_result_pairing(messages: List[Message]) -> RepairReport:
     """Remove orphaned tool_result messages whose tool_use was dropped.
 
-    Scans assistant messages for tool_use IDs (via ``tool_calls`` attribute),
-    then drops any tool-role message whose ``tool_call_id`` is not found in
-    that set.
-
-    If Message lacks these optional fields the function is a safe no-op.
+    Collects tool_use IDs from assistant ``tool_calls`` and drops any
+    tool-role message whose ``tool_call_id`` is not found in that set.
 
     Args:
         messages (List[Message]): Conversation message list to scan and repair.
@@ -71,39 +59,40 @@ def repair_tool_use_result_pairing(messages: List[Message]) -> RepairReport:
     if not messages:
         return RepairReport(messages=messages, dropped_orphan_count=0)
 
+    # Single forward pass: an assistant's tool_use IDs are collected before
+    # its tool results are reached, so a result whose ID is still unknown is
+    # only *possibly* orphaned.  Those are re-checked against the complete
+    # set once the pass is done, which also covers out-of-order histories.
     tool_use_ids: set[str] = set()
-    has_tool_messages = any(
-        msg.role == MessageRole.TOOL and getattr(msg, "tool_call_id", None)
-        for msg in messages
-    )
+    unmatched: List[int] = []
+    # Histories whose tool results all lack a (truthy) ID are left as-is
+    has_tool_ids = False
+    tool_role = MessageRole.TOOL
+    assistant_role = MessageRole.ASSISTANT
+
+    for i, msg in enumerate(messages):
+        role = msg.role
+        if role is assistant_role:
+            for tc in msg.tool_calls or ():
+                tc_id = tc.get("id") if isinstance(tc, dict) else getattr(tc, "id", None)
+                if tc_id:
+                    tool_use_ids.add(tc_id)
+        elif role is tool_role:
+            tc_id = msg.tool_call_id
+            has_tool_ids = has_tool_ids or bool(tc_id)
+            if tc_id is not None and tc_id not in tool_use_ids:
+                unmatched.append(i)
 
-    if not has_tool_messages:
+    orphan_ids = {messages[i].tool_call_id for i in unmatched} - tool_use_ids
+    if not has_tool_ids or not orphan_ids:
         return RepairReport(messages=messages, dropped_orphan_count=0)
 
-    for msg in messages:
-        if msg.role != MessageRole.ASSISTANT:
-            continue
-        tool_calls = getattr(msg, "tool_calls", None)
-        if not tool_calls:
-            continue
-        for tc in tool_calls:
-            tc_id = tc.get("id") if isinstance(tc, dict) else getattr(tc, "id", None)
-            if tc_id:
-                tool_use_ids.add(tc_id)
-
-    repaired: List[Message] = []
-    dropped = 0
-
-    for msg in messages:
-        if msg.role == MessageRole.TOOL:
-            tc_id = getattr(msg, "tool_call_id", None)
-            if tc_id is not None and tc_id not in tool_use_ids:
-                logger.info("Dropped orphaned tool_result: tool_call_id=%s", tc_id)
-                dropped += 1
-                continue
-        repaired.append(msg)
-
-    if dropped:
-        logger.info("Repaired tool_use/tool_result pairing: dropped %d orphans", dropped)
+    for tc_id in sorted(orphan_ids):
+        logger.info("Dropped orphaned tool_result: tool_call_id=%s", tc_id)
+    repaired = [
+        msg for msg in messages if msg.role is not tool_role or msg.tool_call_id not in orphan_ids
+    ]
+    dropped = len(messages) - len(repaired)
+    logger.info("Repaired tool_use/tool_result pairing: dropped %d orphans", dropped)
 
     return RepairReport(messages=repaired, dropped_orphan_count=dropped)
@@ -15,7 +15,7 @@ from typing import List, Optional
 from app.services.prompts.base import TRUNCATION_SUFFIX as _DEFAULT_TRUNCATION_SUFFIX
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ToolPruningConfig:
     """Selective tool pruning via allow/deny glob patterns.
 
@@ -35,7 +35,7 @@ class ToolPruningConfig:
     deny: Optional[List[str]] = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SoftTrimConfig:
     """Soft-trim keeps head + tail of oversized tool results.
 
@@ -50,7 +50,7 @@ class SoftTrimConfig:
     tail_chars: int = 1_500
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class HardClearConfig:
     """Hard-clear replaces entire tool result with a placeholder.
 
@@ -65,7 +65,7 @@ class HardClearConfig:
 
 
 
-@dataclass
+@dataclass(slots=True)
 class CompactionSettings:
     """All compaction-related configuration in one place.
 
@@ -90,6 +90,9 @@ class CompactionSettings:
             trimming.
         hard_clear_ratio (float): Context usage ratio that triggers hard
             clearing.
+        hard_clear_overshoot (float): Share of the context window that
+            hard-clearing frees below ``hard_clear_ratio`` once triggered,
+            so old results are cleared in batches rather than one per call.
         min_prunable_tool_chars (int): Minimum total prunable tool characters
             required before hard-clear is applied.
         soft_trim (SoftTrimConfig): Configuration for soft-trim behaviour.
@@ -100,6 +103,8 @@ class CompactionSettings:
         min_chunk_ratio (float): Minimum chunk ratio after adaptive reduction.
         safety_margin (float): Multiplier applied to average message size for
             adaptive chunk sizing.
+        max_concurrent_summaries (int): Maximum number of part summaries
+            requested from the LLM at once during staged summarization.
         tool_pruning (ToolPruningConfig): Selective pruning via tool name
             allow/deny patterns.
         proactive_pruning_ratio (float): Context usage ratio that triggers
@@ -115,6 +120,7 @@ class CompactionSettings:
     keep_last_assistants: int = 3
     soft_trim_ratio: float = 0.3
     hard_clear_ratio: float = 0.5
+    hard_clear_overshoot: float = 0.2
     min_prunable_tool_chars: int = 50_000
     soft_trim: SoftTrimConfig = field(default_factory=SoftTrimConfig)
     hard_clear: HardClearConfig = field(default_factory=HardClearConfig)
@@ -122,6 +128,7 @@ class CompactionSettings:
     base_chunk_ratio: float = 0.4
     min_chunk_ratio: float = 0.15
     safety_margin: float = 1.2
+    max_concurrent_summaries: int = 4
     tool_pruning: ToolPruningConfig = field(default_factory=ToolPruningConfig)
     proactive_pruning_ratio: float = 0.7
 
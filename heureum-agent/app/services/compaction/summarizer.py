@@ -21,16 +21,24 @@ Integration requirements (outside compaction/):
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-from typing import List, Optional
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Any, Iterator, List, Optional
 
 from app.services.prompts.base import COMPACTION_PREFIX, DEFAULT_SUMMARY_FALLBACK
 from app.models import Message
 from app.schemas.open_responses import MessageRole
 from app.services.compaction.repair import repair_tool_use_result_pairing
 from app.services.compaction.settings import CompactionSettings
-from app.services.compaction.tokens import estimate_messages_tokens, estimate_tokens
+from app.services.compaction.tokens import (
+    estimate_content_tokens,
+    estimate_message_tokens,
+    estimate_messages_tokens,
+    estimate_tokens,
+)
 from app.services.prompts.base import (
     COMPACTION_PROMPT,
     COMPACTION_SYSTEM_PROMPT,
@@ -41,6 +49,14 @@ from langchain_core.messages import HumanMessage, SystemMessage
 
 logger = logging.getLogger(__name__)
 
+# Shared encoder: json.dumps with non-default options builds a new
+# JSONEncoder on every call.
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+# Serialized chunk text may exceed the chunk's char budget by this factor
+# (role labels, separators) before it is cut off.
+_SUMMARY_INPUT_HEADROOM = 1.2
+
 _MERGE_INSTRUCTIONS = (
     "Merge these partial summaries into a single cohesive summary. "
     "Preserve decisions, TODOs, open questions, and any constraints."
@@ -50,6 +66,7 @@ _MERGE_INSTRUCTIONS = (
 def _messages_to_text(
     messages: List[Message],
     max_chars_per_message: int = 2_000,
+    max_chars: Optional[int] = None,
 ) -> str:
     """Serialize messages to text for summarization.
 
@@ -70,50 +87,94 @@ def _messages_to_text(
         messages (List[Message]): Messages to convert.
         max_chars_per_message (int): Maximum characters to keep per message
             content. Defaults to 2000.
+        max_chars (Optional[int]): Cap on the total text length; sections
+            past it are not serialized at all. Defaults to ``None``
+            (no cap).
 
     Returns:
         str: Double-newline-joined string of role-prefixed entries.
     """
-    parts: List[str] = []
+    sections = _iter_message_sections(messages, max_chars_per_message)
+    if max_chars is None:
+        return "\n\n".join(sections)
+
+    kept: List[str] = []
+    remaining = max_chars
+    for section in sections:
+        if len(section) > remaining:
+            if remaining > 0:
+                kept.append(section[:remaining])
+            logger.info("Summary input capped at %d chars", max_chars)
+            break
+        kept.append(section)
+        remaining -= len(section) + 2
+    return "\n\n".join(kept)
+
+
+def _iter_message_sections(messages: List[Message], max_chars_per_message: int) -> Iterator[str]:
+    """Yield the role-prefixed sections of ``_messages_to_text`` in order.
+
+    Args:
+        messages (List[Message]): Messages to convert.
+        max_chars_per_message (int): Maximum characters to keep per message
+            content.
+
+    Yields:
+        str: One ``[Role]: ...`` section per non-empty message part.
+    """
     for msg in messages:
         content = msg.content[:max_chars_per_message]
+        role = msg.role
 
-        if msg.role == MessageRole.USER:
+        if role is MessageRole.USER:
             if content:
-                parts.append(f"[User]: {content}")
+                yield f"[User]: {content}"
 
-        elif msg.role == MessageRole.ASSISTANT:
+        elif role is MessageRole.ASSISTANT:
             # Emit text and tool_calls as separate sections
             if content:
-                parts.append(f"[Assistant]: {content}")
+                yield f"[Assistant]: {content}"
             if msg.tool_calls:
-                tc_strs: List[str] = []
-                for tc in msg.tool_calls:
-                    name = tc.get("name", "unknown") if isinstance(tc, dict) else getattr(tc, "name", "unknown")
-                    args = tc.get("args", {}) if isinstance(tc, dict) else getattr(tc, "args", {})
-                    try:
-                        pairs = ", ".join(f"{k}={json.dumps(v, ensure_ascii=False)}" for k, v in args.items()) if isinstance(args, dict) else json.dumps(args, ensure_ascii=False)
-                    except (TypeError, ValueError):
-                        pairs = str(args)
-                    tc_strs.append(f"{name}({pairs})")
-                parts.append(f"[Assistant tool calls]: {'; '.join(tc_strs)}")
-
-        elif msg.role == MessageRole.TOOL:
-            label = f"[Tool result ({msg.tool_name})]" if msg.tool_name else "[Tool result]"
+                calls = "; ".join(_format_tool_call(tc) for tc in msg.tool_calls)
+                yield f"[Assistant tool calls]: {calls}"
+
+        elif role is MessageRole.TOOL:
             if content:
-                parts.append(f"{label}: {content}")
+                label = f"[Tool result ({msg.tool_name})]" if msg.tool_name else "[Tool result]"
+                yield f"{label}: {content}"
 
-        elif msg.role == MessageRole.SYSTEM:
+        elif role is MessageRole.SYSTEM:
             if content:
-                parts.append(f"[System]: {content}")
+                yield f"[System]: {content}"
+
+
+def _format_tool_call(tc: Any) -> str:
+    """Format one tool call as ``name(key=value, ...)``.
 
-    return "\n\n".join(parts)
+    Args:
+        tc (Any): Tool call dict (or object with ``name``/``args``).
+
+    Returns:
+        str: The call with JSON-encoded argument values, or ``str(args)``
+            when they cannot be encoded.
+    """
+    name = tc.get("name", "unknown") if isinstance(tc, dict) else getattr(tc, "name", "unknown")
+    args = tc.get("args", {}) if isinstance(tc, dict) else getattr(tc, "args", {})
+    try:
+        if isinstance(args, dict):
+            pairs = ", ".join(f"{k}={_encode_json(v)}" for k, v in args.items())
+        else:
+            pairs = _encode_json(args)
+    except (TypeError, ValueError):
+        pairs = str(args)
+    return f"{name}({pairs})"
 
 
 async def _generate_summary(
     messages: List[Message],
     llm: BaseChatModel,
     previous_summary: Optional[str] = None,
+    max_chars: Optional[int] = None,
 ) -> str:
     """Generate an LLM summary of the given messages.
 
@@ -125,11 +186,13 @@ async def _generate_summary(
         llm (BaseChatModel): Language model used to produce the summary.
         previous_summary (Optional[str]): An existing summary to update
             incrementally. Defaults to ``None``.
+        max_chars (Optional[int]): Cap on the serialized conversation
+            length. Defaults to ``None`` (no cap).
 
     Returns:
         str: The generated summary text.
     """
-    conversation = _messages_to_text(messages)
+    conversation = _messages_to_text(messages, max_chars=max_chars)
     if not conversation.strip():
         return previous_summary or DEFAULT_SUMMARY_FALLBACK
 
@@ -172,7 +235,7 @@ def _chunk_messages_by_max_tokens(
     current_tokens = 0
 
     for msg in messages:
-        msg_tokens = estimate_tokens(msg.content)
+        msg_tokens = estimate_content_tokens(msg)
 
         if current and current_tokens + msg_tokens > max_tokens:
             chunks.append(current)
@@ -210,26 +273,24 @@ def _split_by_token_share(
         return [messages] if messages else []
 
     parts = min(parts, len(messages))
-    total_tokens = estimate_messages_tokens(messages)
-    target = total_tokens / parts
-
-    chunks: List[List[Message]] = []
-    current: List[Message] = []
-    current_tokens = 0
-
-    for msg in messages:
-        msg_tokens = estimate_tokens(msg.content)
-        if len(chunks) < parts - 1 and current and current_tokens + msg_tokens > target:
-            chunks.append(current)
-            current = []
-            current_tokens = 0
-
-        current.append(msg)
-        current_tokens += msg_tokens
-
-    if current:
-        chunks.append(current)
-    return chunks
+    # cumulative[j] is the token count of messages[:j]; each boundary is
+    # the cut closest to its share of the total, found by binary search.
+    cumulative = [0, *accumulate(estimate_message_tokens(m) for m in messages)]
+    n = len(messages)
+    total = cumulative[-1]
+
+    bounds = [0]
+    for k in range(1, parts):
+        target = total * k / parts
+        j = bisect_left(cumulative, target)
+        if j > 0 and target - cumulative[j - 1] <= cumulative[j] - target:
+            j -= 1
+        # Keep every part non-empty.
+        j = min(max(j, bounds[-1] + 1), n - (parts - k))
+        bounds.append(j)
+    bounds.append(n)
+
+    return [messages[lo:hi] for lo, hi in zip(bounds, bounds[1:])]
 
 
 def _compute_adaptive_chunk_ratio(
@@ -273,7 +334,7 @@ def _is_oversized_for_summary(msg: Message, settings: CompactionSettings) -> boo
     Returns:
         bool: ``True`` if the message is too large to be summarized safely.
     """
-    tokens = estimate_tokens(msg.content) * settings.safety_margin
+    tokens = estimate_content_tokens(msg) * settings.safety_margin
     return tokens > settings.context_window_tokens * 0.5
 
 
@@ -282,6 +343,7 @@ async def summarize_chunks(
     llm: BaseChatModel,
     max_chunk_tokens: int,
     previous_summary: Optional[str] = None,
+    settings: Optional[CompactionSettings] = None,
 ) -> str:
     """Iteratively summarize message chunks.
 
@@ -291,6 +353,8 @@ async def summarize_chunks(
         max_chunk_tokens (int): Maximum estimated tokens per chunk.
         previous_summary (Optional[str]): An existing summary to update
             incrementally. Defaults to ``None``.
+        settings (Optional[CompactionSettings]): Compaction configuration
+            supplying ``chars_per_token``. Uses defaults if None.
 
     Returns:
         str: The final summary after iterating through all chunks.
@@ -300,9 +364,14 @@ async def summarize_chunks(
 
     chunks = _chunk_messages_by_max_tokens(messages, max_chunk_tokens)
     summary = previous_summary
+    # A chunk is only token-bounded as a whole; a single oversized message
+    # (e.g. huge tool-call arguments, which are not per-message capped)
+    # forms its own chunk, so bound the serialized text as well.
+    chars_per_token = (settings or CompactionSettings()).chars_per_token
+    max_chars = int(max_chunk_tokens * chars_per_token * _SUMMARY_INPUT_HEADROOM)
 
     for chunk in chunks:
-        summary = await _generate_summary(chunk, llm, summary)
+        summary = await _generate_summary(chunk, llm, summary, max_chars)
 
     return summary or DEFAULT_SUMMARY_FALLBACK
 
@@ -324,7 +393,7 @@ async def summarize_with_fallback(
         messages (List[Message]): Messages to summarize.
         llm (BaseChatModel): Language model used to produce summaries.
         settings (CompactionSettings): Compaction configuration for oversized
-            message detection.
+            message detection and the summary input cap.
         max_chunk_tokens (int): Maximum estimated tokens per chunk.
         previous_summary (Optional[str]): An existing summary to update
             incrementally. Defaults to ``None``.
@@ -338,7 +407,9 @@ async def summarize_with_fallback(
         return previous_summary or DEFAULT_SUMMARY_FALLBACK
 
     try:
-        return await summarize_chunks(messages, llm, max_chunk_tokens, previous_summary)
+        return await summarize_chunks(
+            messages, llm, max_chunk_tokens, previous_summary, settings
+        )
     except Exception as e:
         logger.warning("Full summarization failed, trying partial: %s", e)
 
@@ -347,7 +418,7 @@ async def summarize_with_fallback(
 
     for msg in messages:
         if _is_oversized_for_summary(msg, settings):
-            tokens = estimate_tokens(msg.content)
+            tokens = estimate_content_tokens(msg)
             oversized_notes.append(
                 f"[Large {msg.role} (~{tokens // 1000}K tokens) omitted from summary]"
             )
@@ -356,7 +427,9 @@ async def summarize_with_fallback(
 
     if small:
         try:
-            partial = await summarize_chunks(small, llm, max_chunk_tokens, previous_summary)
+            partial = await summarize_chunks(
+                small, llm, max_chunk_tokens, previous_summary, settings
+            )
             notes = "\n\n" + "\n".join(oversized_notes) if oversized_notes else ""
             return partial + notes
         except Exception as e:
@@ -419,17 +492,24 @@ async def summarize_in_stages(
             previous_summary,
         )
 
-    partial_summaries: List[str] = []
-    for idx, chunk in enumerate(splits):
-        chunk_prev = previous_summary if idx == 0 else None
-        summary = await summarize_with_fallback(
-            chunk,
-            llm,
-            settings,
-            max_chunk_tokens,
-            chunk_prev,
-        )
-        partial_summaries.append(summary)
+    # The parts are independent (only the first carries the previous
+    # summary), so their LLM round-trips are overlapped, up to the
+    # configured limit to respect provider rate limits.
+    limit = asyncio.Semaphore(max(1, settings.max_concurrent_summaries))
+
+    async def _summarize_part(idx: int, chunk: List[Message]) -> str:
+        async with limit:
+            return await summarize_with_fallback(
+                chunk,
+                llm,
+                settings,
+                max_chunk_tokens,
+                previous_summary if idx == 0 else None,
+            )
+
+    partial_summaries: List[str] = list(
+        await asyncio.gather(*(_summarize_part(idx, chunk) for idx, chunk in enumerate(splits)))
+    )
 
     if len(partial_summaries) == 1:
         return partial_summaries[0]
@@ -444,6 +524,68 @@ async def summarize_in_stages(
     )
 
 
+def _find_kept_tail_cutoff(
+    messages: List[Message],
+    keep_last_assistants: int,
+    start_idx: int,
+) -> int:
+    """Index where the kept (unsummarized) tail of the history begins.
+
+    The tail starts at the *keep_last_assistants*-th assistant from the
+    end, never before *start_idx*, and is moved back so it does not split
+    an assistant's tool_calls from their tool_results.
+
+    Args:
+        messages (List[Message]): Full conversation message list.
+        keep_last_assistants (int): Number of recent assistant turns to keep.
+        start_idx (int): First index eligible for summarization.
+
+    Returns:
+        int: Cutoff index; ``messages[start_idx:cutoff]`` is summarized.
+    """
+    n = len(messages)
+    assistant_role = MessageRole.ASSISTANT
+    tool_role = MessageRole.TOOL
+    keep = keep_last_assistants
+
+    # The cutoff is the keep-th assistant from the end, provided more than
+    # keep assistants exist.  Scanning backwards stops at the (keep + 1)-th,
+    # so only the tail is visited.
+    cutoff = max(0, n - keep)
+    if keep > 0:
+        seen = 0
+        candidate = 0
+        for i in range(n - 1, -1, -1):
+            if messages[i].role is assistant_role:
+                seen += 1
+                if seen == keep:
+                    candidate = i
+                elif seen > keep:
+                    cutoff = candidate
+                    break
+    else:
+        # keep == 0: cut at the first assistant, or summarize everything
+        # (cutoff stays at n) when there is none.
+        cutoff = next((i for i, m in enumerate(messages) if m.role is assistant_role), cutoff)
+    cutoff = max(cutoff, start_idx)
+
+    # Ensure cutoff doesn't split an assistant's tool_calls from their
+    # tool_results — walk back to keep the pair together.  The walk only
+    # covers the run of tool results at the cutoff.
+    while start_idx < cutoff < n:
+        prev = messages[cutoff - 1]
+        if prev.role is assistant_role and prev.tool_calls:
+            # The assistant at cutoff-1 has tool_calls — its tool_results
+            # follow.  Move cutoff back to include it in the kept tail.
+            return cutoff - 1
+        # If cutoff lands on a tool message, walk back to include the
+        # preceding assistant with its tool_calls.
+        if messages[cutoff].role is not tool_role:
+            break
+        cutoff -= 1
+    return cutoff
+
+
 async def compact_history(
     messages: List[Message],
     llm: BaseChatModel,
@@ -472,7 +614,7 @@ async def compact_history(
     previous_summary: Optional[str] = None
     compaction_idx: Optional[int] = None
     for i, msg in enumerate(messages):
-        if msg.role == MessageRole.SYSTEM and msg.content.startswith(COMPACTION_PREFIX):
+        if msg.role is MessageRole.SYSTEM and msg.content.startswith(COMPACTION_PREFIX):
             previous_summary = msg.content[len(COMPACTION_PREFIX) :].strip()
             compaction_idx = i
             break
@@ -483,7 +625,7 @@ async def compact_history(
     # messages that precede user interaction (OpenClaw pruner.ts:253-257).
     first_user_idx: Optional[int] = None
     for i, msg in enumerate(messages):
-        if msg.role == MessageRole.USER:
+        if msg.role is MessageRole.USER:
             first_user_idx = i
             break
     if first_user_idx is not None and first_user_idx > start_idx:
@@ -491,29 +633,7 @@ async def compact_history(
 
     # Compute kept-tail cutoff FIRST so we only summarize messages that will
     # be removed (avoids duplicating tail in both summary and output).
-    keep = settings.keep_last_assistants
-    assistant_indices = [i for i, m in enumerate(messages) if m.role == MessageRole.ASSISTANT]
-    if len(assistant_indices) > keep:
-        cutoff = assistant_indices[-keep]
-    else:
-        cutoff = max(0, len(messages) - keep)
-    cutoff = max(cutoff, start_idx)
-
-    # Ensure cutoff doesn't split an assistant's tool_calls from their
-    # tool_results — walk back to keep the pair together.
-    while cutoff > start_idx and cutoff < len(messages):
-        prev = messages[cutoff - 1] if cutoff > 0 else None
-        if prev and prev.role == MessageRole.ASSISTANT and prev.tool_calls:
-            # The assistant at cutoff-1 has tool_calls — its tool_results
-            # follow.  Move cutoff back to include it in the kept tail.
-            cutoff = cutoff - 1
-            break
-        # If cutoff lands on a tool message, walk back to include the
-        # preceding assistant with its tool_calls.
-        if messages[cutoff].role == MessageRole.TOOL:
-            cutoff = cutoff - 1
-            continue
-        break
+    cutoff = _find_kept_tail_cutoff(messages, settings.keep_last_assistants, start_idx)
 
     to_summarize = messages[start_idx:cutoff]
 
@@ -524,6 +644,11 @@ async def compact_history(
     max_chunk_tokens = int(settings.context_window_tokens * chunk_ratio)
 
     try:
+        # The kept tail does not depend on the summary text; settle it
+        # before the LLM call instead of after.
+        report = repair_tool_use_result_pairing(messages[cutoff:])
+        kept_tail = report.messages
+
         summary_text = await summarize_in_stages(
             to_summarize,
             llm,
@@ -532,10 +657,6 @@ async def compact_history(
             previous_summary,
         )
 
-        kept_tail = messages[cutoff:]
-
-        report = repair_tool_use_result_pairing(kept_tail)
-        kept_tail = report.messages
         if report.dropped_orphan_count:
             logger.info(
                 "Dropped %d orphaned tool_result(s) after compaction",
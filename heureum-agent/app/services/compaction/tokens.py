@@ -16,41 +16,90 @@ Our implementation mirrors this by serialising ``tool_calls`` JSON.
 
 from __future__ import annotations
 
+import functools
 import json
 import logging
-from typing import List
+import os
+from typing import Any, Dict, List, Optional
 
 from app.models import Message
 
 TOOL_CALL_FALLBACK_CHARS = 128
 CHARS_PER_TOKEN_FALLBACK = 4
+# tiktoken encoding used by gpt-4o.
+DEFAULT_ENCODING = "o200k_base"
 
 logger = logging.getLogger(__name__)
 
+# Shared encoder: json.dumps with non-default options builds a new
+# JSONEncoder on every call.
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
 try:
     import tiktoken
 
-    _encoding = tiktoken.encoding_for_model("gpt-4o")
+    @functools.lru_cache(maxsize=4)
+    def _get_encoding(name: str) -> tiktoken.Encoding:
+        """Load a tiktoken encoding once per process.
+
+        Args:
+            name (str): Encoding name, e.g. ``"o200k_base"``.
+
+        Returns:
+            tiktoken.Encoding: The shared encoding instance.
+        """
+        return tiktoken.get_encoding(name)
+
+    # Loaded eagerly so a missing BPE file selects the heuristic below.
+    _encoding = _get_encoding(DEFAULT_ENCODING)
 
-    def estimate_tokens(text: str) -> int:
+    def estimate_tokens(text: str, encoding_name: Optional[str] = None) -> int:
         """Estimate token count using tiktoken.
 
+        Uses ``encode_ordinary``, which skips the special-token scan and
+        counts special-token text as ordinary text.
+
         Args:
             text (str): Text to tokenize.
+            encoding_name (Optional[str]): Encoding to use instead of
+                ``DEFAULT_ENCODING``. Defaults to ``None``.
 
         Returns:
             int: Number of tokens produced by the tiktoken encoder.
         """
-        return len(_encoding.encode(text))
+        encoding = _encoding if encoding_name is None else _get_encoding(encoding_name)
+        return len(encoding.encode_ordinary(text))
+
+    # The batch encoder tokenizes on native threads outside the GIL.
+    _ENCODE_THREADS = max(1, (os.cpu_count() or 2) // 2)
+
+    def estimate_tokens_batch(texts: List[str]) -> List[int]:
+        """Estimate token counts for many texts in one tiktoken call.
+
+        Uses ``encode_ordinary_batch``: special-token text is counted as
+        ordinary text instead of being rejected.
+
+        Args:
+            texts (List[str]): Texts to tokenize.
+
+        Returns:
+            List[int]: Token count of each text, in input order.
+        """
+        batch = _encoding.encode_ordinary_batch(texts, num_threads=_ENCODE_THREADS)
+        return [len(ids) for ids in batch]
 
 except Exception:
     logger.info("tiktoken unavailable, using chars/%d heuristic", CHARS_PER_TOKEN_FALLBACK)
 
-    def estimate_tokens(text: str) -> int:  # type: ignore[misc]
+    def estimate_tokens(  # type: ignore[misc]
+        text: str, encoding_name: Optional[str] = None
+    ) -> int:
         """Estimate token count using character heuristic.
 
         Args:
             text (str): Text to estimate tokens for.
+            encoding_name (Optional[str]): Ignored; accepted for parity with
+                the tiktoken variant. Defaults to ``None``.
 
         Returns:
             int: Estimated token count (at least 1), computed as
@@ -58,6 +107,17 @@ except Exception:
         """
         return max(1, len(text) // CHARS_PER_TOKEN_FALLBACK)
 
+    def estimate_tokens_batch(texts: List[str]) -> List[int]:  # type: ignore[misc]
+        """Estimate token counts for many texts using character heuristic.
+
+        Args:
+            texts (List[str]): Texts to estimate tokens for.
+
+        Returns:
+            List[int]: Estimated token count of each text, in input order.
+        """
+        return [max(1, len(text) // CHARS_PER_TOKEN_FALLBACK) for text in texts]
+
 
 def _tool_calls_chars(msg: Message) -> int:
     """Extra characters contributed by tool_calls metadata.
@@ -65,23 +125,85 @@ def _tool_calls_chars(msg: Message) -> int:
     Mirrors OpenClaw's pruner.ts (line 126-132) which adds
     ``JSON.stringify(b.arguments ?? {}).length`` for each toolCall block.
 
+    The result is memoised on the message, since truncation, pruning and
+    summarization each measure the same history.  Messages are therefore
+    treated as immutable once measured.
+
     Args:
         msg (Message): Message whose tool_calls to measure.
 
     Returns:
         int: Estimated character count of serialised tool_calls.
     """
-    if not msg.tool_calls:
+    tool_calls = msg.tool_calls
+    if not tool_calls:
         return 0
+    sizes = msg._sizes
+    if sizes.tool_calls_chars is None:
+        sizes.tool_calls_chars = _serialised_tool_calls_chars(tool_calls)
+    return sizes.tool_calls_chars
+
+
+def _serialised_tool_calls_chars(tool_calls: List[Dict[str, Any]]) -> int:
+    """Sum of the JSON-serialised lengths of individual tool calls.
+
+    Args:
+        tool_calls (List[Dict[str, Any]]): Tool call descriptors to measure.
+
+    Returns:
+        int: Character count, with ``TOOL_CALL_FALLBACK_CHARS`` standing in
+            for any call that cannot be serialised.
+    """
+    try:
+        # One encoder call for the whole list; the brackets and ", "
+        # separators it adds are subtracted to get the per-call sum.
+        encoded = _encode_json(tool_calls)
+        return len(encoded) - 2 * len(tool_calls)
+    except (TypeError, ValueError):
+        pass
     chars = 0
-    for tc in msg.tool_calls:
+    for tc in tool_calls:
         try:
-            chars += len(json.dumps(tc, ensure_ascii=False))
+            chars += len(_encode_json(tc))
         except (TypeError, ValueError):
             chars += TOOL_CALL_FALLBACK_CHARS
     return chars
 
 
+def _tool_calls_tokens(chars: int) -> int:
+    """Token estimate for ``chars`` characters of serialised tool_calls.
+
+    Uses the chars-per-token heuristic directly rather than tokenizing a
+    padding string of that length.
+
+    Args:
+        chars (int): Character count from ``_tool_calls_chars``.
+
+    Returns:
+        int: Estimated token count (at least 1).
+    """
+    return max(1, chars // CHARS_PER_TOKEN_FALLBACK)
+
+
+def estimate_content_tokens(msg: Message) -> int:
+    """Estimate the token count of a message's ``content`` alone.
+
+    Memoised on the message: a compaction cycle sizes the same messages
+    several times (chunking, splitting, adaptive ratio, oversize checks),
+    and each estimate is a full tokenizer pass.
+
+    Args:
+        msg (Message): Message whose content to estimate.
+
+    Returns:
+        int: Estimated token count of ``msg.content``.
+    """
+    sizes = msg._sizes
+    if sizes.content_tokens is None:
+        sizes.content_tokens = estimate_tokens(msg.content)
+    return sizes.content_tokens
+
+
 def estimate_message_tokens(msg: Message) -> int:
     """Estimate token count for a single message.
 
@@ -95,10 +217,11 @@ def estimate_message_tokens(msg: Message) -> int:
         int: Estimated token count of the message content plus tool
             calls.
     """
+    tokens = estimate_content_tokens(msg)
     extra = _tool_calls_chars(msg)
     if extra:
-        return estimate_tokens(msg.content) + estimate_tokens(" " * extra)
-    return estimate_tokens(msg.content)
+        tokens += _tool_calls_tokens(extra)
+    return tokens
 
 
 def estimate_messages_tokens(messages: List[Message]) -> int:
@@ -110,6 +233,13 @@ def estimate_messages_tokens(messages: List[Message]) -> int:
     Returns:
         int: Sum of estimated token counts across all messages.
     """
+    # Tokenize every not-yet-measured content in one batch call to fill
+    # the memos; the sum below then only reads them.
+    pending = [m for m in messages if m._sizes.content_tokens is None]
+    if len(pending) > 1:
+        counts = estimate_tokens_batch([m.content for m in pending])
+        for msg, tokens in zip(pending, counts):
+            msg._sizes.content_tokens = tokens
     return sum(estimate_message_tokens(m) for m in messages)
 
 
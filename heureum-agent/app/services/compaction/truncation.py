@@ -30,8 +30,6 @@ from app.services.compaction.settings import CompactionSettings
 
 logger = logging.getLogger(__name__)
 
-_TOOL_ROLES = frozenset({MessageRole.TOOL})
-
 
 def calculate_max_tool_result_chars(settings: CompactionSettings) -> int:
     """Max allowed characters for a single tool result.
@@ -74,10 +72,11 @@ def truncate_tool_result_text(
         return text
 
     keep_chars = max(min_keep_chars, max_chars - len(suffix))
-    # Prefer breaking at a newline within the last 20 % of the kept region
+    # Prefer breaking at a newline within the last 20 % of the kept region;
+    # only that window is searched (strictly past the 80 % mark).
     cut_point = keep_chars
-    last_newline = text.rfind("\n", 0, keep_chars)
-    if last_newline > keep_chars * 0.8:
+    last_newline = text.rfind("\n", int(keep_chars * 0.8) + 1, keep_chars)
+    if last_newline >= 0:
         cut_point = last_newline
 
     return text[:cut_point] + suffix
@@ -100,30 +99,43 @@ def truncate_oversized_tool_results(
             that were truncated.
     """
     max_chars = calculate_max_tool_result_chars(settings)
-    truncated_count = 0
-    result: List[Message] = []
-
-    for msg in messages:
-        if msg.role not in _TOOL_ROLES or len(msg.content) <= max_chars:
-            result.append(msg)
-            continue
-
-        original_len = len(msg.content)
+    tool_role = MessageRole.TOOL
+    # Locate the oversized results first; most histories have none, and
+    # only the marked positions need a new Message.  The size test comes
+    # first since it rejects almost every message, whatever its role.
+    oversized = [
+        i
+        for i, msg in enumerate(messages)
+        if len(msg.content) > max_chars and msg.role is tool_role
+    ]
+    result = list(messages)
+    if not oversized:
+        return result, 0
+
+    min_keep_chars = settings.min_keep_chars
+    suffix = settings.truncation_suffix
+    for i in oversized:
+        msg = result[i]
         truncated_content = truncate_tool_result_text(
             msg.content,
             max_chars,
-            min_keep_chars=settings.min_keep_chars,
-            suffix=settings.truncation_suffix,
+            min_keep_chars=min_keep_chars,
+            suffix=suffix,
+        )
+        # Fields are copied from an already-validated Message.
+        result[i] = Message.model_construct(
+            role=msg.role,
+            content=truncated_content,
+            tool_call_id=msg.tool_call_id,
+            tool_name=msg.tool_name,
         )
-        result.append(Message(role=msg.role, content=truncated_content, tool_call_id=msg.tool_call_id, tool_name=msg.tool_name))
-        truncated_count += 1
         logger.info(
             "Truncated tool result: %d chars -> %d chars",
-            original_len,
+            len(msg.content),
             len(truncated_content),
         )
 
-    return result, truncated_count
+    return result, len(oversized)
 
 
 def has_oversized_tool_results(
@@ -142,4 +154,5 @@ def has_oversized_tool_results(
             maximum allowed character count.
     """
     max_chars = calculate_max_tool_result_chars(settings)
-    return any(msg.role in _TOOL_ROLES and len(msg.content) > max_chars for msg in messages)
+    tool_role = MessageRole.TOOL
+    return any(len(msg.content) > max_chars and msg.role is tool_role for msg in messages)
@@ -10,14 +10,12 @@ Used by periodic tasks in headless mode to report results.
 import logging
 from typing import Any, Dict
 
-import httpx
-
-from app.config import settings
+from app.services.reliability import PlatformService
 
 logger = logging.getLogger(__name__)
 
 
-class NotificationService:
+class NotificationService(PlatformService):
     """Sends notifications via Platform API internal endpoint."""
 
     async def execute(
@@ -39,14 +37,14 @@ class NotificationService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(
-                    f"{settings.MCP_SERVER_URL}/api/v1/notifications/internal/send/",
-                    json=payload,
-                )
-                if resp.status_code in (200, 201):
-                    return f"Notification sent: {title}"
-                return f"Error sending notification: {resp.text}"
+            resp = await self._request(
+                "POST",
+                "/api/v1/notifications/internal/send/",
+                json=payload,
+            )
+            if resp.status_code in (200, 201):
+                return f"Notification sent: {title}"
+            return f"Error sending notification: {resp.text}"
         except Exception as e:
             logger.warning("Failed to send notification: %s", e)
             return f"Error sending notification: {e}"
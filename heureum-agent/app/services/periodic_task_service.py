@@ -7,17 +7,30 @@ The agent calls manage_periodic_task to register recurring tasks after
 a successful dry run.  State is persisted via the Platform API.
 """
 
+import json
 import logging
 from typing import Any, Dict
 
-import httpx
-
-from app.config import settings
+from app.services.reliability import PlatformService
 
 logger = logging.getLogger(__name__)
 
-
-class PeriodicTaskService:
+# Cron day_of_week values (0/7 = Sunday) -> display label
+_DOW_LABELS = {
+    "*": "Every day",
+    "1-5": "Weekdays",
+    "0": "Every Sunday",
+    "1": "Every Monday",
+    "2": "Every Tuesday",
+    "3": "Every Wednesday",
+    "4": "Every Thursday",
+    "5": "Every Friday",
+    "6": "Every Saturday",
+    "7": "Every Sunday",
+}
+
+
+class PeriodicTaskService(PlatformService):
     """Manages periodic tasks via Platform API."""
 
     async def execute(
@@ -64,28 +77,27 @@ class PeriodicTaskService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(
-                    f"{settings.MCP_SERVER_URL}/api/v1/periodic-tasks/internal/create/",
-                    json=payload,
-                )
-                if resp.status_code in (200, 201):
-                    data = resp.json()
-                    import json
-                    return json.dumps({
-                        "success": True,
-                        "task": {
-                            "id": data["id"],
-                            "title": data["title"],
-                            "description": data.get("description", ""),
-                            "schedule_display": _format_schedule(data.get("schedule", {})),
-                            "timezone_name": data.get("timezone_name", "Asia/Seoul"),
-                            "next_run_at": data.get("next_run_at"),
-                            "status": data["status"],
-                            "notify_on_success": data.get("notify_on_success", True),
-                        },
-                    })
-                return f"Error registering periodic task: {resp.text}"
+            resp = await self._request(
+                "POST",
+                "/api/v1/periodic-tasks/internal/create/",
+                json=payload,
+            )
+            if resp.status_code in (200, 201):
+                data = resp.json()
+                return json.dumps({
+                    "success": True,
+                    "task": {
+                        "id": data["id"],
+                        "title": data["title"],
+                        "description": data.get("description", ""),
+                        "schedule_display": _format_schedule(data.get("schedule", {})),
+                        "timezone_name": data.get("timezone_name", "Asia/Seoul"),
+                        "next_run_at": data.get("next_run_at"),
+                        "status": data["status"],
+                        "notify_on_success": data.get("notify_on_success", True),
+                    },
+                })
+            return f"Error registering periodic task: {resp.text}"
         except Exception as e:
             logger.warning("Failed to register periodic task: %s", e)
             return f"Error registering periodic task: {e}"
@@ -93,31 +105,30 @@ class PeriodicTaskService:
     async def _list(self, session_id: str) -> str:
         """List periodic tasks for the current session."""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.get(
-                    f"{settings.MCP_SERVER_URL}/api/v1/periodic-tasks/internal/list/",
-                    params={"session_id": session_id},
-                )
-                if resp.status_code == 200:
-                    tasks = resp.json()
-                    import json
-                    return json.dumps({
-                        "success": True,
-                        "tasks": [
-                            {
-                                "id": t["id"],
-                                "title": t["title"],
-                                "status": t["status"],
-                                "schedule_display": _format_schedule(t.get("schedule", {})),
-                                "next_run_at": t.get("next_run_at"),
-                                "total_runs": t["total_runs"],
-                                "total_successes": t["total_successes"],
-                                "total_failures": t["total_failures"],
-                            }
-                            for t in tasks
-                        ],
-                    })
-                return f"Error listing periodic tasks: {resp.text}"
+            resp = await self._request(
+                "GET",
+                "/api/v1/periodic-tasks/internal/list/",
+                params={"session_id": session_id},
+            )
+            if resp.status_code == 200:
+                tasks = resp.json()
+                return json.dumps({
+                    "success": True,
+                    "tasks": [
+                        {
+                            "id": t["id"],
+                            "title": t["title"],
+                            "status": t["status"],
+                            "schedule_display": _format_schedule(t.get("schedule", {})),
+                            "next_run_at": t.get("next_run_at"),
+                            "total_runs": t["total_runs"],
+                            "total_successes": t["total_successes"],
+                            "total_failures": t["total_failures"],
+                        }
+                        for t in tasks
+                    ],
+                })
+            return f"Error listing periodic tasks: {resp.text}"
         except Exception as e:
             logger.warning("Failed to list periodic tasks: %s", e)
             return f"Error listing periodic tasks: {e}"
@@ -128,15 +139,16 @@ class PeriodicTaskService:
             return "Error: task_id is required"
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.patch(
-                    f"{settings.MCP_SERVER_URL}/api/v1/periodic-tasks/internal/{task_id}/update/",
-                    json={"status": status},
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    return f"Periodic task {task_id} updated to status: {data['status']}"
-                return f"Error updating task: {resp.text}"
+            resp = await self._request(
+                "PATCH",
+                f"/api/v1/periodic-tasks/internal/{task_id}/update/",
+                json={"status": status},
+                idempotent=True,
+            )
+            if resp.status_code == 200:
+                data = resp.json()
+                return f"Periodic task {task_id} updated to status: {data['status']}"
+            return f"Error updating task: {resp.text}"
         except Exception as e:
             logger.warning("Failed to update periodic task: %s", e)
             return f"Error updating task: {e}"
@@ -147,17 +159,17 @@ class PeriodicTaskService:
             return "Error: task_id is required"
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(
-                    f"{settings.MCP_SERVER_URL}/api/v1/periodic-tasks/internal/{task_id}/resume/",
+            resp = await self._request(
+                "POST",
+                f"/api/v1/periodic-tasks/internal/{task_id}/resume/",
+            )
+            if resp.status_code == 200:
+                data = resp.json()
+                return (
+                    f"Periodic task {task_id} resumed.\n"
+                    f"  Next run: {data.get('next_run_at', 'N/A')}"
                 )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    return (
-                        f"Periodic task {task_id} resumed.\n"
-                        f"  Next run: {data.get('next_run_at', 'N/A')}"
-                    )
-                return f"Error resuming task: {resp.text}"
+            return f"Error resuming task: {resp.text}"
         except Exception as e:
             logger.warning("Failed to resume periodic task: %s", e)
             return f"Error resuming task: {e}"
@@ -172,17 +184,12 @@ def _format_schedule(schedule: dict) -> str:
     if stype == "cron":
         c = schedule.get("cron", {})
         hour = c.get("hour", "*")
-        minute = c.get("minute", 0)
+        mm = str(c.get("minute", 0)).zfill(2)
         dow = c.get("day_of_week", "*")
 
-        time_str = f"{hour}:{str(minute).zfill(2)}" if hour != "*" else f"every hour at :{str(minute).zfill(2)}"
-
-        if dow == "*":
-            return f"Every day at {time_str}"
-        elif dow == "1-5":
-            return f"Weekdays at {time_str}"
-        else:
-            return f"Day {dow} at {time_str}"
+        time_str = f"{hour}:{mm}" if hour != "*" else f"every hour at :{mm}"
+        label = _DOW_LABELS.get(str(dow))
+        return f"{label} at {time_str}" if label else f"Day {dow} at {time_str}"
 
     elif stype == "interval":
         i = schedule.get("interval", {})
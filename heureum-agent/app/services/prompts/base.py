@@ -25,7 +25,8 @@ Key guidelines from the Anthropic docs:
   7. Tool instructions should be direct, not emphatic.
 """
 
-from datetime import datetime, timezone
+import functools
+import time
 from typing import Any, Dict, List, Optional
 
 from app.config import settings
@@ -59,6 +60,9 @@ For complex topics, break down your explanation step by step.
 </response_style>
 """
 
+# Static part of build_identity_prompt(); only the datetime is filled per call
+_IDENTITY_PREFIX = AGENT_IDENTITY_PROMPT + "\n<current_datetime>"
+
 ASK_QUESTION_TOOL_PROMPT = """
 
 
@@ -110,22 +114,22 @@ Use browser_new_tab to open pages without leaving the user's current tab.
 </tool_guide>
 """
 
-BROWSER_TOOL_NAMES = {
+BROWSER_TOOL_NAMES = frozenset({
     "browser_navigate",
     "browser_new_tab",
     "browser_click",
     "browser_type",
     "browser_get_content",
-}
+})
 
-MOBILE_TOOL_NAMES = {
+MOBILE_TOOL_NAMES = frozenset({
     "get_device_info", "get_sensor_data",
     "get_contacts", "get_location", "take_photo", "send_notification",
     "get_clipboard", "set_clipboard",
     "send_sms", "share_content", "trigger_haptic", "open_url",
-}
+})
 
-SESSION_FILE_TOOL_NAMES = {"read_file", "write_file", "list_files", "delete_file"}
+SESSION_FILE_TOOL_NAMES = frozenset({"read_file", "write_file", "list_files", "delete_file"})
 
 MOBILE_TOOL_PROMPT = """
 
@@ -437,11 +441,34 @@ def _build_mcp_tools_prompt(mcp_tools: List[Dict[str, Any]]) -> str:
     return "\n".join(lines)
 
 
-def build_system_prompt(
+def build_identity_prompt() -> str:
+    """Build the identity section stamped with the current UTC datetime.
+
+    Returns:
+        str: The identity prompt followed by a ``<current_datetime>`` tag.
+    """
+    return _identity_prompt_at(int(time.time()))
+
+
+@functools.lru_cache(maxsize=1)
+def _identity_prompt_at(epoch_second: int) -> str:
+    """Format the identity prompt for one UTC second.
+
+    The stamp has second resolution, so turns within the same second share
+    one string instead of re-running strftime.
+    """
+    now_str = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(epoch_second))
+    return f"{_IDENTITY_PREFIX}{now_str}</current_datetime>"
+
+
+def build_tools_prompt(
     tool_names: List[str],
     mcp_tools: Optional[List[Dict[str, Any]]] = None,
 ) -> str:
-    """Build a system prompt based on available tools.
+    """Build the tool guidance sections for the available tools.
+
+    Unlike the identity section, the output depends only on its arguments,
+    so callers may cache it.
 
     Args:
         tool_names (List[str]): All tool names (client + MCP).
@@ -449,24 +476,24 @@ def build_system_prompt(
             dynamic prompt generation.
 
     Returns:
-        str: The assembled system prompt string.
+        str: Newline-joined tool sections, or empty string if none apply.
     """
-    now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-    parts = [AGENT_IDENTITY_PROMPT + f"\n<current_datetime>{now_str}</current_datetime>"]
+    parts = []
+    names = frozenset(tool_names)
 
-    if "ask_question" in tool_names:
+    if "ask_question" in names:
         parts.append(ASK_QUESTION_TOOL_PROMPT)
-    if "bash" in tool_names:
+    if "bash" in names:
         parts.append(BASH_TOOL_PROMPT)
-    if BROWSER_TOOL_NAMES.intersection(tool_names):
+    if not BROWSER_TOOL_NAMES.isdisjoint(names):
         parts.append(BROWSER_TOOL_PROMPT)
-    if MOBILE_TOOL_NAMES.intersection(tool_names):
+    if not MOBILE_TOOL_NAMES.isdisjoint(names):
         parts.append(MOBILE_TOOL_PROMPT)
-    if SESSION_FILE_TOOL_NAMES.intersection(tool_names):
+    if not SESSION_FILE_TOOL_NAMES.isdisjoint(names):
         parts.append(SESSION_FILE_TOOL_PROMPT)
-    if "manage_todo" in tool_names:
+    if "manage_todo" in names:
         parts.append(TODO_TOOL_PROMPT)
-    if "manage_periodic_task" in tool_names:
+    if "manage_periodic_task" in names:
         parts.append(PERIODIC_TASK_TOOL_PROMPT)
 
     # Dynamic MCP tools section
@@ -474,3 +501,23 @@ def build_system_prompt(
         parts.append(_build_mcp_tools_prompt(mcp_tools))
 
     return "\n".join(parts)
+
+
+def build_system_prompt(
+    tool_names: List[str],
+    mcp_tools: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """Build a system prompt based on available tools.
+
+    Args:
+        tool_names (List[str]): All tool names (client + MCP).
+        mcp_tools (Optional[List[Dict[str, Any]]]): MCP tool schemas for
+            dynamic prompt generation.
+
+    Returns:
+        str: The assembled system prompt string.
+    """
+    tools_prompt = build_tools_prompt(tool_names, mcp_tools)
+    if tools_prompt:
+        return f"{build_identity_prompt()}\n{tools_prompt}"
+    return build_identity_prompt()
@@ -7,6 +7,7 @@ Discovers tools dynamically from configured MCP server URLs.
 Uses streamable-http transport for FastMCP 2025-03-26 servers.
 """
 
+import asyncio
 import json
 import logging
 import time
@@ -25,6 +26,9 @@ from mcp.client.streamable_http import streamablehttp_client
 
 logger = logging.getLogger(__name__)
 
+# Display prefixes clients wrap around an ask_question answer
+_APPROVAL_ANSWER_PREFIXES = ("User chose: ", "User input: ")
+
 
 def _gen_call_id() -> str:
     """Generate a unique tool call ID."""
@@ -88,6 +92,8 @@ class MCPClient:
         """
         self._server_urls = server_urls or [settings.MCP_SERVER_URL]
         self._connections: Dict[str, _ServerConnection] = {}
+        # Per-server lock so concurrent first uses share one connect
+        self._connect_locks: Dict[str, asyncio.Lock] = {}
         self._server_tool_names: Set[str] = set()
         self._tool_to_server: Dict[str, str] = {}  # tool_name -> server_url
         self._available_tools: List[Dict[str, Any]] = []
@@ -110,14 +116,21 @@ class MCPClient:
         if conn and conn.session:
             return conn.session
 
-        if conn:
-            await conn.close()
+        lock = self._connect_locks.setdefault(server_url, asyncio.Lock())
+        async with lock:
+            # Another caller may have connected while we waited for the lock
+            conn = self._connections.get(server_url)
+            if conn and conn.session:
+                return conn.session
+
+            if conn:
+                await conn.close()
 
-        conn = _ServerConnection(url=server_url)
-        self._connections[server_url] = conn
-        await conn.connect()
-        logger.info("Established persistent SSE connection to %s", server_url)
-        return conn.session
+            conn = _ServerConnection(url=server_url)
+            self._connections[server_url] = conn
+            await conn.connect()
+            logger.info("Established persistent SSE connection to %s", server_url)
+            return conn.session
 
     async def _disconnect_server(self, server_url: str) -> None:
         """Close and remove connection for a server.
@@ -153,61 +166,95 @@ class MCPClient:
             self._chain_registry.clear()
         self._approval_required_tools.clear()
 
-        for url in self._server_urls:
-            try:
-                session = await self._get_session(url)
-                response = await session.list_tools()
-
-                for tool in response.tools:
-                    self._available_tools.append(
-                        {
-                            "type": "function",
-                            "function": {
-                                "name": tool.name,
-                                "description": tool.description or "",
-                                "parameters": tool.inputSchema,
-                            },
-                        }
-                    )
-                    self._server_tool_names.add(tool.name)
-                    self._tool_to_server[tool.name] = url
-
-                    # Collect metadata: chain rules & approval requirements
-                    meta = getattr(tool, "meta", None) or {}
-                    chain = meta.get("chain")
-                    if isinstance(chain, list) and chain and self._chain_registry:
-                        steps = [
-                            ChainStep(
-                                target=entry["target"],
-                                extract=entry["extract"],
-                                arg_mapping=entry.get("arg_mapping", {}),
-                            )
-                            for entry in chain
-                        ]
-                        self._chain_registry.register(
-                            ChainRule(source=tool.name, steps=steps)
-                        )
-                    if meta.get("requires_approval"):
-                        self._approval_required_tools.add(tool.name)
-
-                logger.info(
-                    "Discovered %d tools from MCP server %s: %s",
-                    len(response.tools),
-                    url,
-                    [t.name for t in response.tools],
-                )
-                if self._chain_registry and self._chain_registry.rules:
-                    logger.info("Chain rules discovered: %s", list(self._chain_registry.rules.keys()))
-                if self._approval_required_tools:
-                    logger.info("Approval-required tools: %s", self._approval_required_tools)
-
-            except Exception as e:
-                logger.warning("MCP server unavailable at %s: %s", url, e)
+        # Servers are independent: query them concurrently, then merge in
+        # configured order so later servers still win tool-name collisions.
+        results = await asyncio.gather(
+            *(self._discover_server(url) for url in self._server_urls),
+            return_exceptions=True,
+        )
+        for url, result in zip(self._server_urls, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                logger.warning("MCP server unavailable at %s: %s", url, result)
                 await self._disconnect_server(url)
+                continue
+
+            tools, chain_rules, approval_required = result
+            self._available_tools.extend(tools)
+            for tool in tools:
+                tool_name = tool["function"]["name"]
+                self._server_tool_names.add(tool_name)
+                self._tool_to_server[tool_name] = url
+            if self._chain_registry:
+                for rule in chain_rules:
+                    self._chain_registry.register(rule)
+            self._approval_required_tools.update(approval_required)
+
+            logger.info(
+                "Discovered %d tools from MCP server %s: %s",
+                len(tools),
+                url,
+                [t["function"]["name"] for t in tools],
+            )
+
+        if self._chain_registry and self._chain_registry.rules:
+            logger.info("Chain rules discovered: %s", list(self._chain_registry.rules.keys()))
+        if self._approval_required_tools:
+            logger.info("Approval-required tools: %s", self._approval_required_tools)
 
         self._cache_timestamp = now
         return self._available_tools
 
+    async def _discover_server(
+        self, server_url: str
+    ) -> Tuple[List[Dict[str, Any]], List[ChainRule], Set[str]]:
+        """List one server's tools without touching shared discovery state.
+
+        Args:
+            server_url (str): The MCP server base URL.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], List[ChainRule], Set[str]]: The
+                server's tool schemas, chain rules from tool metadata, and
+                names of tools that require approval.
+        """
+        session = await self._get_session(server_url)
+        response = await session.list_tools()
+
+        tools: List[Dict[str, Any]] = []
+        chain_rules: List[ChainRule] = []
+        approval_required: Set[str] = set()
+        for tool in response.tools:
+            tools.append(
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description or "",
+                        "parameters": tool.inputSchema,
+                    },
+                }
+            )
+
+            # Collect metadata: chain rules & approval requirements
+            meta = getattr(tool, "meta", None) or {}
+            chain = meta.get("chain")
+            if isinstance(chain, list) and chain:
+                steps = [
+                    ChainStep(
+                        target=entry["target"],
+                        extract=entry["extract"],
+                        arg_mapping=entry.get("arg_mapping", {}),
+                    )
+                    for entry in chain
+                ]
+                chain_rules.append(ChainRule(source=tool.name, steps=steps))
+            if meta.get("requires_approval"):
+                approval_required.add(tool.name)
+
+        return tools, chain_rules, approval_required
+
     async def call_tool(self, name: str, arguments: Dict[str, Any]) -> str:
         """Call a tool on its MCP server and return the result as text.
 
@@ -285,8 +332,10 @@ class MCPClient:
         self, tool_calls: List[ToolCallInfo], session_id: str
     ) -> Tuple[List[ToolCallInfo], List[ToolCallInfo]]:
         """2-way classification: (client_calls, server_calls)."""
-        client_calls = [tc for tc in tool_calls if tc.name in CLIENT_TOOLS]
-        server_calls = [tc for tc in tool_calls if tc.name not in CLIENT_TOOLS]
+        client_calls: List[ToolCallInfo] = []
+        server_calls: List[ToolCallInfo] = []
+        for tc in tool_calls:
+            (client_calls if tc.name in CLIENT_TOOLS else server_calls).append(tc)
         return client_calls, server_calls
 
     def request_approval(
@@ -401,13 +450,13 @@ class MCPClient:
         #   heureum-client api.ts). Decouple by having clients send the raw
         #   value directly instead of wrapping it with a display prefix.
         """
-        for msg in messages:
-            if msg.role == MessageRole.TOOL and msg.tool_call_id == approval_call_id:
+        # The answer is normally the newest message, so scan from the end
+        for msg in reversed(messages):
+            if msg.tool_call_id == approval_call_id and msg.role == MessageRole.TOOL:
                 content = msg.content or ""
-                if content.startswith("User chose: "):
-                    return content[len("User chose: "):]
-                if content.startswith("User input: "):
-                    return content[len("User input: "):]
+                for prefix in _APPROVAL_ANSWER_PREFIXES:
+                    if content.startswith(prefix):
+                        return content[len(prefix):]
                 return content
         return None
 
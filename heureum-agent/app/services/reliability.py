@@ -0,0 +1,283 @@
+# Copyright (c) 2026 Heureum AI. All rights reserved.
+
+"""
+Reliability helpers for Platform internal API calls.
+
+Tool services (TODO, periodic tasks, notifications) call the Platform API
+on the agent's hot path.  ``make_platform_client`` builds the one pooled
+keep-alive client they share, ``request_with_retry`` retries transient
+failures with full-jitter exponential backoff, and a shared
+``CircuitBreaker`` fails fast while the Platform is down instead of
+letting every tool call wait out its timeout.  ``PlatformService`` ties
+these together for the services.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean the request was not (or may safely be) processed
+_RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+# Of those, the ones that guarantee the server did not act on the request,
+# so they are safe to retry for non-idempotent methods too
+_UNPROCESSED_STATUSES = frozenset({429, 503})
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Transport errors raised before the request reached the server
+_UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Per-attempt connect timeout; the rest of each attempt's budget is the
+# time left before the call's deadline
+_CONNECT_TIMEOUT = 2.0  # seconds
+
+
+def make_platform_client() -> httpx.AsyncClient:
+    """Build the pooled keep-alive client for Platform API calls.
+
+    Returns:
+        httpx.AsyncClient: Client with ``base_url`` set to the Platform.
+    """
+    return httpx.AsyncClient(
+        base_url=settings.MCP_SERVER_URL,
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=20,
+            keepalive_expiry=30,
+        ),
+        timeout=httpx.Timeout(10.0, connect=_CONNECT_TIMEOUT),
+    )
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open).
+
+    After ``fail_threshold`` consecutive failures the circuit opens and
+    calls are rejected for ``reset_after`` seconds.  The first call after
+    that is let through as a trial: success closes the circuit, failure
+    re-opens it for another ``reset_after`` seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fail_threshold: Optional[int] = None,
+        reset_after: Optional[float] = None,
+    ) -> None:
+        """Initialize the breaker.
+
+        Args:
+            name (str): Label used in logs and errors.
+            fail_threshold (Optional[int]): Consecutive failures that open
+                the circuit. Defaults to ``PLATFORM_API_BREAKER_THRESHOLD``.
+            reset_after (Optional[float]): Seconds to stay open before a
+                trial call. Defaults to ``PLATFORM_API_BREAKER_RESET``.
+        """
+        self.name = name
+        self.fail_threshold = (
+            settings.PLATFORM_API_BREAKER_THRESHOLD
+            if fail_threshold is None
+            else fail_threshold
+        )
+        self.reset_after = (
+            settings.PLATFORM_API_BREAKER_RESET if reset_after is None else reset_after
+        )
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being rejected."""
+        return self._opened_at is not None and (
+            self._trial_in_flight
+            or time.monotonic() - self._opened_at < self.reset_after
+        )
+
+    def before_call(self) -> None:
+        """Admit a call or raise ``CircuitOpenError``.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a
+                trial call already in flight.
+        """
+        if self._opened_at is None:
+            return
+        if self.is_open:
+            raise CircuitOpenError(f"{self.name} unavailable (circuit open)")
+        self._trial_in_flight = True
+
+    def release_trial(self) -> None:
+        """Give up a half-open trial slot without recording an outcome."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        """Close the circuit and reset the failure count."""
+        if self._opened_at is not None:
+            logger.info("Circuit %s closed", self.name)
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit at the threshold."""
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._opened_at is not None or self._failures >= self.fail_threshold:
+            if self._opened_at is None:
+                logger.warning(
+                    "Circuit %s opened after %d consecutive failures",
+                    self.name,
+                    self._failures,
+                )
+            self._opened_at = time.monotonic()
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (1-based)."""
+    cap = min(
+        settings.PLATFORM_API_RETRY_MAX_DELAY,
+        settings.PLATFORM_API_RETRY_BASE_DELAY * (2 ** (attempt - 1)),
+    )
+    return random.uniform(0, cap)
+
+
+async def request_with_retry(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    *,
+    breaker: Optional[CircuitBreaker] = None,
+    idempotent: Optional[bool] = None,
+    deadline: Optional[float] = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """Send a request, retrying transient failures with jittered backoff.
+
+    Connection failures and 429/503 responses are retried for any method,
+    since the server never acted on the request.  Read errors and 502/504
+    are only retried for idempotent requests, so a slow POST is never
+    replayed (e.g. registering a periodic task twice).
+
+    All attempts share one deadline: each attempt's timeout is the time
+    left, and no retry is scheduled whose backoff would overrun it.
+
+    Args:
+        client (httpx.AsyncClient): Client to send the request with.
+        method (str): HTTP method.
+        url (str): Request URL, relative to the client's base_url.
+        breaker (Optional[CircuitBreaker]): Breaker to consult and update.
+            Server errors and transport failures count as failures.
+        idempotent (Optional[bool]): Override the method-based idempotency
+            check (e.g. for a PATCH that sets an absolute value).
+        deadline (Optional[float]): ``time.monotonic()`` value by which the
+            call must finish. Defaults to now + ``PLATFORM_API_CALL_BUDGET``.
+        **kwargs (Any): Passed through to ``client.request``.
+
+    Returns:
+        httpx.Response: The last response received.
+
+    Raises:
+        CircuitOpenError: If the breaker rejects the call.
+        httpx.TimeoutException: If the deadline passed before an attempt.
+        httpx.HTTPError: If the last attempt failed at the transport level.
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in _IDEMPOTENT_METHODS
+    retry_statuses = _RETRYABLE_STATUSES if idempotent else _UNPROCESSED_STATUSES
+    retry_errors = httpx.TransportError if idempotent else _UNSENT_ERRORS
+    max_retries = settings.PLATFORM_API_MAX_RETRIES
+    if deadline is None:
+        deadline = time.monotonic() + settings.PLATFORM_API_CALL_BUDGET
+
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise httpx.TimeoutException(f"deadline exceeded for {method} {url}")
+        if breaker is not None:
+            breaker.before_call()
+        timeout = httpx.Timeout(remaining, connect=min(_CONNECT_TIMEOUT, remaining))
+        try:
+            resp = await client.request(method, url, timeout=timeout, **kwargs)
+        except httpx.TransportError as e:
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt >= max_retries or not isinstance(e, retry_errors):
+                raise
+            reason: object = e
+            delay = _backoff_delay(attempt + 1)
+            if delay >= deadline - time.monotonic():
+                raise
+        except BaseException:
+            # Cancelled or failed outside the transport: the outcome is
+            # unknown, so free the half-open trial slot for the next caller
+            if breaker is not None:
+                breaker.release_trial()
+            raise
+        else:
+            if breaker is not None:
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if attempt >= max_retries or resp.status_code not in retry_statuses:
+                return resp
+            reason = resp.status_code
+            delay = _backoff_delay(attempt + 1)
+            if delay >= deadline - time.monotonic():
+                return resp
+
+        attempt += 1
+        logger.warning(
+            "Platform %s %s failed (attempt %d/%d), retrying in %.2fs: %s",
+            method,
+            url,
+            attempt,
+            max_retries,
+            delay,
+            reason,
+        )
+        await asyncio.sleep(delay)
+
+
+class PlatformService:
+    """Base for tool services backed by the Platform internal API."""
+
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        """Initialize the service.
+
+        Args:
+            http_client (Optional[httpx.AsyncClient]): Client for Platform API
+                calls. A pooled client is created (and owned) if None.
+            breaker (Optional[CircuitBreaker]): Circuit breaker for Platform
+                API calls; share one across services that hit the same host.
+        """
+        self._owns_client = http_client is None
+        self._client = http_client or make_platform_client()
+        self._breaker = breaker or CircuitBreaker("Platform API")
+
+    async def aclose(self) -> None:
+        """Close the Platform API client if this service created it."""
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a Platform API request with retry and circuit breaking."""
+        return await request_with_retry(
+            self._client, method, url, breaker=self._breaker, **kwargs
+        )
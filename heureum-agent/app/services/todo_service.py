@@ -17,10 +17,15 @@ from typing import Any, Dict, List, Optional
 
 import httpx
 
-from app.config import settings
+from app.services.reliability import CircuitBreaker, PlatformService
 
 logger = logging.getLogger(__name__)
 
+# Runs of non-alphanumerics collapse to "-" in TODO filenames
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+# Step status -> icon used in the compact tool-result view
+_STATUS_ICONS = {"pending": "○", "in_progress": "⟳", "completed": "✓", "failed": "✗"}
+
 
 @dataclass
 class TodoStep:
@@ -42,12 +47,27 @@ class SessionTodo:
     updated_at: float = field(default_factory=time.time)
 
 
-class TodoService:
+class TodoService(PlatformService):
     """Manages TODO plans per session with markdown persistence."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        """Initialize the TodoService.
+
+        Args:
+            http_client (Optional[httpx.AsyncClient]): Client for Platform API
+                calls. A pooled client is created (and owned) if None.
+            breaker (Optional[CircuitBreaker]): Circuit breaker for Platform
+                API calls; share one across services that hit the same host.
+        """
+        super().__init__(http_client, breaker)
         self._session_todos: Dict[str, SessionTodo] = {}
         self._session_history: Dict[str, List[SessionTodo]] = {}
+        # session_id -> rendered get_state_prompt(); dropped on every mutation
+        self._state_prompts: Dict[str, Optional[str]] = {}
 
     async def execute(
         self, name: str, arguments: Dict[str, Any], session_id: str
@@ -80,7 +100,7 @@ class TodoService:
     @staticmethod
     def _make_todo_filename(task: str) -> str:
         """Generate a unique TODO filename from the task description."""
-        slug = re.sub(r"[^a-z0-9]+", "-", task.lower()).strip("-")[:40]
+        slug = _SLUG_RE.sub("-", task.lower()).strip("-")[:40]
         ts = datetime.now(timezone.utc).strftime("%H%M%S")
         return f"TODO-{slug}-{ts}.md"
 
@@ -105,6 +125,7 @@ class TodoService:
             filename=filename,
         )
         self._session_todos[session_id] = todo
+        self._state_prompts.pop(session_id, None)
         await self._write_todo_file(session_id, todo)
         return self._format_state(todo)
 
@@ -128,6 +149,7 @@ class TodoService:
             step.result = result
         todo.updated_at = time.time()
 
+        self._state_prompts.pop(session_id, None)
         await self._write_todo_file(session_id, todo)
         return self._format_state(todo)
 
@@ -152,6 +174,7 @@ class TodoService:
             todo.steps.extend(new_steps)
 
         todo.updated_at = time.time()
+        self._state_prompts.pop(session_id, None)
         await self._write_todo_file(session_id, todo)
         return self._format_state(todo)
 
@@ -170,7 +193,17 @@ class TodoService:
         return None
 
     def get_state_prompt(self, session_id: str) -> Optional[str]:
-        """Return compact TODO state for system prompt injection."""
+        """Return compact TODO state for system prompt injection.
+
+        Called on every agent iteration, so the rendered block is cached
+        until the session's TODO state changes.
+        """
+        if session_id not in self._state_prompts:
+            self._state_prompts[session_id] = self._build_state_prompt(session_id)
+        return self._state_prompts[session_id]
+
+    def _build_state_prompt(self, session_id: str) -> Optional[str]:
+        """Render the TODO state and previous attempts for the system prompt."""
         parts: List[str] = []
 
         # Include history from previous attempts
@@ -242,6 +275,7 @@ class TodoService:
         """Remove TODO state for an evicted session."""
         self._session_todos.pop(session_id, None)
         self._session_history.pop(session_id, None)
+        self._state_prompts.pop(session_id, None)
 
     @staticmethod
     def render_markdown(todo: SessionTodo) -> str:
@@ -280,17 +314,16 @@ class TodoService:
     async def _write_todo_file(self, session_id: str, todo: SessionTodo) -> None:
         """Write TODO plan file to session files via Platform API."""
         content = self.render_markdown(todo)
-        url = f"{settings.MCP_SERVER_URL}/api/v1/sessions/{session_id}/files/write/"
+        url = f"/api/v1/sessions/{session_id}/files/write/"
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(url, json={
-                    "path": todo.filename,
-                    "content": content,
-                    "created_by": "agent",
-                })
-                if resp.status_code not in (200, 201):
-                    logger.warning("Failed to write %s: %s", todo.filename, resp.text)
+            resp = await self._request("POST", url, json={
+                "path": todo.filename,
+                "content": content,
+                "created_by": "agent",
+            })
+            if resp.status_code not in (200, 201):
+                logger.warning("Failed to write %s: %s", todo.filename, resp.text)
         except Exception as e:
             logger.warning("Failed to write %s: %s", todo.filename, e)
 
@@ -299,9 +332,7 @@ class TodoService:
         """Format TODO state as a compact string for LLM tool result."""
         lines = [f"TODO Plan: {todo.task}", ""]
         for i, step in enumerate(todo.steps):
-            icon = {"pending": "○", "in_progress": "⟳", "completed": "✓", "failed": "✗"}.get(
-                step.status, "○"
-            )
+            icon = _STATUS_ICONS.get(step.status, "○")
             result_part = f" — {step.result}" if step.result else ""
             lines.append(f"  {icon} {i}. {step.description}{result_part}")
 
@@ -2,6 +2,8 @@
 
 """Tests for AgentService."""
 
+import asyncio
+import logging
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -10,11 +12,15 @@ from app.schemas.open_responses import MessageRole
 from app.schemas.tool_schema import TOOL_SCHEMA_MAP
 from app.config import settings
 from app.services.prompts.base import COMPACTION_PREFIX
+from app.services import agent_service as agent_service_module
 from app.services.agent_service import (
     AgentService,
     _is_thought_signature_error,
     _strip_tool_messages,
+    _invalidate_stale_browser_results,
+    _is_browser_page_content,
     _is_context_overflow_error,
+    _normalize_usage_metadata,
 )
 from app.services.compaction.settings import CompactionSettings
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
@@ -135,6 +141,36 @@ class TestMakeSystemPrompt:
         prompt = svc._make_system_prompt([])
         assert "web_search" in prompt
 
+    def test_tool_sections_cached(self):
+        """Repeated calls with the same inputs reuse the cached tool sections."""
+        svc = _create_service()
+        with patch(
+            "app.services.agent_service.build_tools_prompt", return_value="<tools/>"
+        ) as build:
+            first = svc._make_system_prompt(["bash"], instructions="x")
+            second = svc._make_system_prompt(["bash"], instructions="x")
+        build.assert_called_once()
+        assert first.endswith("<tools/>\n\n<instructions>\nx\n</instructions>")
+        assert "<current_datetime>" in second
+
+    def test_mcp_tools_assignment_invalidates_cache(self):
+        """Assigning new MCP tools rebuilds the cached prompt."""
+        svc = _create_service()
+        assert "web_search" not in svc._make_system_prompt([])
+        svc.mcp_tools = [{"type": "function", "function": {"name": "web_search"}}]
+        assert "web_search" in svc._make_system_prompt([])
+
+    def test_system_message_reused_while_text_unchanged(self):
+        """The SystemMessage is shared until the prompt text changes."""
+        svc = _create_service()
+        with patch("app.services.agent_service.build_identity_prompt", return_value="id@1"):
+            first = svc._make_system_message(["bash"])
+            assert svc._make_system_message(["bash"]) is first
+        with patch("app.services.agent_service.build_identity_prompt", return_value="id@2"):
+            second = svc._make_system_message(["bash"])
+        assert second is not first
+        assert second.content.startswith("id@2")
+
 
 # ---------------------------------------------------------------------------
 # _resolve_tool_schemas
@@ -173,6 +209,15 @@ class TestResolveToolSchemas:
         svc = _create_service()
         assert svc._resolve_tool_schemas([]) == []
 
+    def test_cached_until_mcp_tools_change(self):
+        """Schemas are reused per tool list and rebuilt when MCP tools change."""
+        svc = _create_service()
+        first = svc._resolve_tool_schemas(["bash"])
+        assert svc._resolve_tool_schemas(["bash"]) is first
+        svc.mcp_tools = [{"type": "function", "function": {"name": "mcp_tool"}}]
+        names = [s["function"]["name"] for s in svc._resolve_tool_schemas(["bash"])]
+        assert names == ["bash", "mcp_tool"]
+
 
 # ---------------------------------------------------------------------------
 # _call_llm
@@ -395,6 +440,26 @@ class TestCompactSession:
         await svc._compact_session("s1")
         assert svc.sessions["s1"][0].role == MessageRole.SYSTEM
 
+    @pytest.mark.asyncio
+    async def test_kept_tail_reuses_original_lc_messages(self):
+        """Verify the kept tail is taken from the original LC history."""
+        svc = _create_service()
+        svc.llm.ainvoke.return_value = MagicMock(content="Summary")
+        svc.sessions["s1"] = [
+            Message(role=MessageRole.USER, content="q1"),
+            Message(role=MessageRole.ASSISTANT, content="a1"),
+            Message(role=MessageRole.USER, content="q2"),
+            Message(role=MessageRole.ASSISTANT, content="a2"),
+            Message(role=MessageRole.USER, content="q3"),
+            Message(role=MessageRole.ASSISTANT, content="a3"),
+        ]
+        original = list(svc._lc_sessions["s1"])
+        result = await svc._compact_session("s1")
+        lc_history = svc._lc_sessions["s1"]
+        tail_len = sum(1 for m in result if not m.content.startswith("[compaction]"))
+        assert len(lc_history) == len(result)
+        assert all(a is b for a, b in zip(lc_history[len(lc_history) - tail_len:], original[len(original) - tail_len:]))
+
 
 # ---------------------------------------------------------------------------
 # process_messages
@@ -427,6 +492,34 @@ class TestProcessMessages:
         )
         assert len(svc.sessions[r1.session_id]) == 4  # q1, r1, q2, r2
 
+    @pytest.mark.asyncio
+    async def test_different_sessions_call_llm_concurrently(self):
+        """Verify LLM calls for different sessions overlap instead of queueing."""
+        svc = _create_service()
+        in_flight = 0
+        both_in_flight = asyncio.Event()
+
+        async def fake_ainvoke(lc_messages):
+            nonlocal in_flight
+            in_flight += 1
+            if in_flight == 2:
+                both_in_flight.set()
+            await asyncio.wait_for(both_in_flight.wait(), timeout=1)
+            return _mock_response("ok")
+
+        svc.llm.ainvoke.side_effect = fake_ainvoke
+        results = await asyncio.gather(
+            svc.process_messages([Message(role=MessageRole.USER, content="a")], session_id="s1"),
+            svc.process_messages([Message(role=MessageRole.USER, content="b")], session_id="s2"),
+        )
+        assert [r.message for r in results] == ["ok", "ok"]
+
+    def test_session_lock_reused(self):
+        """Verify the same lock object is returned for a session."""
+        svc = _create_service()
+        assert svc._get_session_lock("s1") is svc._get_session_lock("s1")
+        assert svc._get_session_lock("s1") is not svc._get_session_lock("s2")
+
     @pytest.mark.asyncio
     async def test_instructions_forwarded(self):
         """Verify custom instructions are forwarded into the system prompt."""
@@ -573,6 +666,35 @@ class TestOverflowRecovery:
         )
         assert result.message == "recovered"
 
+    @pytest.mark.asyncio
+    async def test_retry_request_uses_recovered_history(self):
+        """After recovery the retried request carries the compacted history."""
+        svc = _create_service()
+        sent = []
+
+        async def side_effect(msgs):
+            sent.append([m.content for m in msgs])
+            if len(sent) == 1:
+                svc._lc_sessions["s1"] = [HumanMessage(content="compacted")]
+                raise Exception("maximum context length exceeded")
+            return _mock_response("ok")
+
+        svc.llm.ainvoke.side_effect = side_effect
+        svc.sessions["s1"] = [
+            Message(role=MessageRole.USER, content="q1"),
+            Message(role=MessageRole.ASSISTANT, content="a1"),
+        ]
+        with patch.object(
+            svc,
+            "_try_overflow_recovery",
+            new=AsyncMock(return_value=([], 1, True, False)),
+        ):
+            await svc.process_messages(
+                [Message(role=MessageRole.USER, content="q2")], session_id="s1"
+            )
+        assert sent[0][1:] == ["q1", "a1", "q2"]
+        assert sent[1][1:] == ["compacted", "q2"]
+
     @pytest.mark.asyncio
     async def test_non_overflow_propagates(self):
         """Verify non-overflow exceptions propagate without recovery attempt."""
@@ -705,6 +827,63 @@ class TestToolMessageFallback:
         assert len(calls) == 2  # initial tools-bound + immediate no-tools fallback
         sleep_mock.assert_not_awaited()
 
+    @staticmethod
+    def _tool_history_service():
+        """Create a service whose session history holds a tool interaction."""
+        svc = _create_service()
+        svc.sessions["s1"] = [
+            Message(
+                role=MessageRole.ASSISTANT,
+                content="",
+                tool_calls=[{"name": "web_search", "args": {"query": "q"}, "id": "call_1"}],
+            ),
+            Message(role=MessageRole.TOOL, content="Error: failed", tool_call_id="call_1", tool_name="web_search"),
+        ]
+        svc._maybe_proactive_compact = AsyncMock(return_value=None)
+        return svc
+
+    @pytest.mark.asyncio
+    async def test_parallel_fallbacks_first_success_wins(self):
+        """With parallel fallbacks on, a slow no-tools call loses to the clean-context call."""
+        svc = self._tool_history_service()
+        cancelled = asyncio.Event()
+
+        async def fake_call_llm(lc_messages, tools):
+            if tools:
+                raise Exception("INVALID_ARGUMENT")
+            if any(isinstance(m, ToolMessage) for m in lc_messages):
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return _mock_response("clean")
+
+        svc._call_llm = AsyncMock(side_effect=fake_call_llm)
+        with patch.object(settings, "LLM_PARALLEL_FALLBACKS", True):
+            resp = await svc._invoke_with_recovery(
+                new_messages=[], tool_names=["bash"], session_id="s1", use_tools=True,
+            )
+
+        assert resp.content == "clean"
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_parallel_fallbacks_all_fail_reraises_original(self):
+        """When every raced fallback fails, the primary error propagates."""
+        svc = self._tool_history_service()
+
+        async def fake_call_llm(lc_messages, tools):
+            raise Exception("primary" if tools else "fallback")
+
+        svc._call_llm = AsyncMock(side_effect=fake_call_llm)
+        with patch.object(settings, "LLM_PARALLEL_FALLBACKS", True):
+            with pytest.raises(Exception, match="primary"):
+                await svc._invoke_with_recovery(
+                    new_messages=[], tool_names=["bash"], session_id="s1", use_tools=True,
+                )
+        assert svc._call_llm.await_count == 3
+
 
 # ---------------------------------------------------------------------------
 # Truncation one-shot guard
@@ -782,6 +961,32 @@ class TestTruncationOneShot:
         tool_msg = [m for m in svc.sessions["s1"] if m.role == MessageRole.TOOL][0]
         assert len(tool_msg.content) < len(tool_content)
 
+    @pytest.mark.asyncio
+    async def test_fallback_truncation_keeps_untouched_lc_messages(self):
+        """Fallback truncation replaces only the truncated LC messages."""
+        svc = _create_service(compaction_settings=CompactionSettings(context_window_tokens=1_000))
+        ai = AIMessage(
+            content="",
+            tool_calls=[{"name": "bash", "args": {}, "id": "c1"}],
+            response_metadata={"signature": "sig"},
+        )
+        svc._lc_sessions["s1"] = [
+            HumanMessage(content="q"),
+            ai,
+            ToolMessage(content="x" * 50_000, tool_call_id="c1"),
+        ]
+        lc_history = svc._lc_sessions["s1"]
+        _, _, ok, _ = await svc._try_overflow_recovery(
+            "s1",
+            settings.MAX_OVERFLOW_RETRIES,
+            truncation_attempted=False,
+        )
+        assert ok is True
+        assert svc._lc_sessions["s1"] is lc_history
+        assert lc_history[1] is ai
+        assert len(lc_history[2].content) < 50_000
+        assert lc_history[2].tool_call_id == "c1"
+
 
 # ---------------------------------------------------------------------------
 # Multiple tool calls
@@ -921,6 +1126,62 @@ class TestAppendToolInteractionBatch:
         assert history[2].role == MessageRole.TOOL
         assert history[3].role == MessageRole.TOOL
 
+    @pytest.mark.asyncio
+    async def test_new_page_invalidates_previous_snapshot(self):
+        """A fresh browser page replaces the previous snapshot in history."""
+        svc = _create_service()
+        svc.sessions["s1"] = []
+        for i, url in enumerate(["https://a.example", "https://b.example"]):
+            await svc.append_tool_interaction(
+                "s1",
+                [],
+                [{"name": "browser_navigate", "args": {"url": url}, "id": f"c{i}"}],
+                [
+                    Message(
+                        role=MessageRole.TOOL,
+                        content=f'Page: "P{i}" URL: {url}\n[Interactive Elements]',
+                        tool_call_id=f"c{i}",
+                        tool_name="browser_navigate",
+                    )
+                ],
+            )
+        contents = [m.content for m in svc._lc_sessions["s1"] if isinstance(m, HumanMessage)]
+        assert contents[0] == '[Stale page snapshot replaced] Page: "P0" URL: https://a.example'
+        assert contents[1].startswith('[Tool result: browser_navigate] Page: "P1"')
+
+    @pytest.mark.asyncio
+    async def test_request_messages_converted_once(self):
+        """Messages sent to the LLM are persisted as the same LC objects."""
+        svc = _create_service()
+        svc.llm.ainvoke.return_value = _mock_tool_call()
+        user_msg = Message(role=MessageRole.USER, content="run it")
+        result = await svc.process_messages_with_tools([user_msg], ["bash"], session_id="s1")
+        sent = svc.llm.ainvoke.await_args.args[0][-1]
+        await svc.append_tool_interaction(
+            "s1",
+            [user_msg],
+            [tc.model_dump() for tc in result.tool_calls],
+            [Message(role=MessageRole.TOOL, content="ok", tool_call_id="call_1")],
+        )
+        assert svc._lc_sessions["s1"][0] is sent
+        assert svc._lc_memo == {}
+
+    @pytest.mark.asyncio
+    async def test_synthetic_tool_result_round_trip(self):
+        """Synthetic "[Tool result: name]" messages map back to TOOL messages."""
+        svc = _create_service()
+        svc.sessions["s1"] = []
+        await svc.append_tool_interaction(
+            "s1",
+            [],
+            [{"name": "bash", "args": {}, "id": "c1"}],
+            [Message(role=MessageRole.TOOL, content="a]b", tool_name="bash")],
+        )
+        result = svc.sessions["s1"][1]
+        assert result.role == MessageRole.TOOL
+        assert result.tool_name == "bash"
+        assert result.content == "a]b"
+
 
 # ---------------------------------------------------------------------------
 # Actual-usage-based proactive compaction
@@ -1063,3 +1324,348 @@ class TestActualUsageBasedCompaction:
         """_get_last_input_tokens returns None for unknown session."""
         svc = _create_service()
         assert svc._get_last_input_tokens("nonexistent") is None
+
+
+# ---------------------------------------------------------------------------
+# _preview_text
+# ---------------------------------------------------------------------------
+
+
+class TestPreviewText:
+    """Tests for the single-line log preview helper."""
+
+    def test_short_text_escapes_newlines(self):
+        """Short content is returned whole with newlines escaped."""
+        assert AgentService._preview_text("a\nb", limit=10) == "a\\nb"
+
+    def test_long_text_truncated_and_escaped(self):
+        """Long content keeps an escaped head and reports the dropped length."""
+        preview = AgentService._preview_text("a\nb" + "c" * 20, limit=5)
+        assert preview == "a\\nbcc...(truncated 18 chars)"
+
+
+class TestLogPreLlmHistory:
+    """Tests for the pre-call history debug log."""
+
+    def test_skips_serialization_above_debug(self, caplog):
+        """History is not serialized when DEBUG records would be dropped."""
+        svc = _create_service()
+        caplog.set_level(logging.INFO, logger=agent_service_module.__name__)
+        with patch.object(svc, "_serialize_lc_history_for_log") as serialize:
+            svc._log_pre_llm_history(
+                stage="primary", session_id="s1", lc_messages=[HumanMessage(content="q")], tools=[],
+            )
+        serialize.assert_not_called()
+        assert "LLM_PRECALL_HISTORY" not in caplog.text
+
+    def test_logs_payload_at_debug(self, caplog):
+        """History is serialized and logged when DEBUG is enabled."""
+        svc = _create_service()
+        caplog.set_level(logging.DEBUG, logger=agent_service_module.__name__)
+        svc._log_pre_llm_history(
+            stage="primary", session_id="s1", lc_messages=[HumanMessage(content="q")], tools=[],
+        )
+        assert "LLM_PRECALL_HISTORY stage=primary session=s1" in caplog.text
+
+
+# ---------------------------------------------------------------------------
+# _rehydrate_session
+# ---------------------------------------------------------------------------
+
+
+def _platform_response(status_code: int = 200, payload=None):
+    """Create a mock httpx response from the Platform messages endpoint."""
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.json.return_value = payload if payload is not None else {"results": []}
+    return resp
+
+
+class TestRehydrateSession:
+    """Tests for Platform DB rehydration through the shared HTTP client."""
+
+    @pytest.mark.asyncio
+    async def test_disabled_skips_platform(self):
+        """No Platform call is made when rehydration is disabled."""
+        client = AsyncMock()
+        svc = _create_service(http_client=client)
+        with patch.object(settings, "SESSION_REHYDRATION_ENABLED", False):
+            assert await svc._rehydrate_session("s1") is None
+        client.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_maps_platform_records(self):
+        """Text messages are restored in order; tool items are skipped."""
+        client = AsyncMock()
+        client.get.return_value = _platform_response(
+            payload={
+                "results": [
+                    {"type": "message", "role": "user", "content": [{"text": "hi"}]},
+                    {"type": "function_call", "role": "tool", "content": {}},
+                    {"type": "message", "role": "assistant", "content": [{"text": "hello"}]},
+                ]
+            }
+        )
+        svc = _create_service(http_client=client)
+        with patch.object(settings, "SESSION_REHYDRATION_ENABLED", True):
+            sid, history = await svc._get_or_create_session("s1")
+        assert sid == "s1"
+        assert isinstance(history[0], HumanMessage)
+        assert isinstance(history[1], AIMessage)
+        assert [m.content for m in history] == ["hi", "hello"]
+
+    @pytest.mark.asyncio
+    async def test_missing_session_negative_cached(self):
+        """A 404 is remembered so the next miss skips the Platform call."""
+        client = AsyncMock()
+        client.get.return_value = _platform_response(status_code=404)
+        svc = _create_service(http_client=client)
+        with patch.object(settings, "SESSION_REHYDRATION_ENABLED", True):
+            assert await svc._rehydrate_session("ghost") is None
+            assert await svc._rehydrate_session("ghost") is None
+        assert client.get.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_aclose_leaves_injected_client_open(self):
+        """Only a service-owned client is closed by aclose()."""
+        client = AsyncMock()
+        svc = _create_service(http_client=client)
+        await svc.aclose()
+        client.aclose.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_compacted_view_restores_summary(self):
+        """A compaction summary from Platform becomes the leading system message."""
+        client = AsyncMock()
+        client.get.return_value = _platform_response(
+            payload={
+                "compaction_summary": "User asked about X.",
+                "messages": [{"type": "message", "role": "user", "content": [{"text": "next"}]}],
+            }
+        )
+        svc = _create_service(http_client=client)
+        with patch.object(settings, "SESSION_REHYDRATION_ENABLED", True):
+            history = await svc._rehydrate_session("s1")
+        assert client.get.await_args.kwargs["params"]["view"] == "compacted"
+        assert history[0].content == f"{COMPACTION_PREFIX}\nUser asked about X."
+        assert history[1].content == "next"
+        restored = svc._to_app_message(history[0])
+        assert restored.role == MessageRole.SYSTEM
+
+
+# ---------------------------------------------------------------------------
+# _normalize_usage_metadata
+# ---------------------------------------------------------------------------
+
+
+class TestNormalizeUsageMetadata:
+    """Tests for coercing usage dicts into LangChain usage_metadata shape."""
+
+    def test_empty_returns_none(self):
+        """Missing usage yields None."""
+        assert _normalize_usage_metadata(None) is None
+        assert _normalize_usage_metadata({}) is None
+
+    def test_total_derived_when_missing(self):
+        """total_tokens falls back to input + output when absent or null."""
+        assert _normalize_usage_metadata({"input_tokens": 3, "output_tokens": None}) == {
+            "input_tokens": 3,
+            "output_tokens": 0,
+            "total_tokens": 3,
+        }
+
+    def test_explicit_total_kept(self):
+        """An explicit total_tokens value is preserved."""
+        usage = {"input_tokens": 1, "output_tokens": 2, "total_tokens": 10}
+        assert _normalize_usage_metadata(usage)["total_tokens"] == 10
+
+
+# ---------------------------------------------------------------------------
+# Shared LLM client
+# ---------------------------------------------------------------------------
+
+
+class TestSharedLlm:
+    """Tests for lazy, process-wide LLM client reuse."""
+
+    def test_llm_created_lazily_and_shared(self):
+        """The LLM is built on first access and reused across services."""
+        with patch.dict(agent_service_module._LLM_CACHE, clear=True), patch(
+            "app.services.agent_service.create_llm", return_value=MagicMock()
+        ) as factory:
+            first = AgentService()
+            second = AgentService()
+            factory.assert_not_called()
+            assert first.llm is second.llm
+            factory.assert_called_once()
+
+
+# ---------------------------------------------------------------------------
+# _estimate_session_tokens
+# ---------------------------------------------------------------------------
+
+
+class TestEstimateSessionTokens:
+    """Tests for per-message token-count reuse across estimates."""
+
+    def test_counts_reused_until_message_replaced(self):
+        """Unchanged messages are not re-tokenized; replaced ones are."""
+        svc = _create_service()
+        svc.sessions["s1"] = [
+            Message(role=MessageRole.USER, content="hello"),
+            Message(role=MessageRole.TOOL, content="old", tool_call_id="c1"),
+        ]
+        with patch(
+            "app.services.agent_service.estimate_message_tokens", return_value=7
+        ) as count:
+            assert svc._estimate_session_tokens("s1") == 14
+            assert svc._estimate_session_tokens("s1") == 14
+            assert count.call_count == 2
+            svc.replace_tool_result("s1", "c1", "new")
+            assert svc._estimate_session_tokens("s1") == 14
+            assert count.call_count == 3
+
+    def test_evicted_session_drops_cache(self):
+        """Session eviction also discards its cached counts."""
+        svc = _create_service()
+        svc.sessions["s1"] = [Message(role=MessageRole.USER, content="hello")]
+        svc._estimate_session_tokens("s1")
+        svc._evict_session("s1")
+        assert "s1" not in svc._token_cache
+
+    @pytest.mark.asyncio
+    async def test_threaded_estimate_skips_cache_for_evicted_session(self):
+        """Counts from the worker thread are not stored for an evicted session."""
+        svc = _create_service()
+        svc.sessions["s1"] = [Message(role=MessageRole.USER, content="hello")]
+        count = svc._count_history_tokens
+
+        def count_then_evict(history, previous):
+            result = count(history, previous)
+            svc._evict_session("s1")
+            return result
+
+        with patch.object(svc, "_count_history_tokens", side_effect=count_then_evict):
+            await svc._maybe_proactive_compact(
+                "s1", [Message(role=MessageRole.USER, content="next")]
+            )
+        assert "s1" not in svc._token_cache
+
+
+# ---------------------------------------------------------------------------
+# replace_tool_result
+# ---------------------------------------------------------------------------
+
+
+class TestReplaceToolResult:
+    """Tests for placeholder tool-result replacement."""
+
+    @pytest.mark.asyncio
+    async def test_replaces_indexed_result(self):
+        """A result appended with its LC assistant message is found via the index."""
+        svc = _create_service()
+        assistant = AIMessage(content="", tool_calls=[{"name": "bash", "args": {}, "id": "c1"}])
+        await svc.append_tool_interaction(
+            "s1",
+            [Message(role=MessageRole.USER, content="go")],
+            [{"name": "bash", "args": {}, "id": "c1"}],
+            [Message(role=MessageRole.TOOL, content="pending", tool_call_id="c1")],
+            assistant_lc_message=assistant,
+        )
+        assert svc._tool_call_index["s1"] == {"c1": 2}
+        assert svc.replace_tool_result("s1", "c1", "done") is True
+        assert svc._lc_sessions["s1"][2].content == "done"
+
+    def test_stale_index_falls_back_to_scan(self):
+        """A position invalidated by a history rewrite is re-resolved."""
+        svc = _create_service()
+        svc._lc_sessions["s1"] = [
+            HumanMessage(content="go"),
+            ToolMessage(content="pending", tool_call_id="c1"),
+        ]
+        svc._tool_call_index["s1"] = {"c1": 5}
+        assert svc.replace_tool_result("s1", "c1", "done") is True
+        assert svc._lc_sessions["s1"][1].content == "done"
+        assert svc._tool_call_index["s1"]["c1"] == 1
+
+    def test_unknown_call_id(self):
+        """Replacing an unknown tool_call_id reports no match."""
+        svc = _create_service()
+        svc._lc_sessions["s1"] = [HumanMessage(content="go")]
+        assert svc.replace_tool_result("s1", "missing", "x") is False
+
+
+# ---------------------------------------------------------------------------
+# Browser page snapshot invalidation
+# ---------------------------------------------------------------------------
+
+
+class TestBrowserPageSnapshots:
+    """Tests for detecting and invalidating stale browser DOM snapshots."""
+
+    def test_detects_page_header(self):
+        """Content starting with a page header is a snapshot."""
+        assert _is_browser_page_content('Page: "Home" URL: https://a.example') is True
+
+    def test_marker_only_within_scan_window(self):
+        """The interactive-elements marker counts only near the top."""
+        marker = "[Interactive Elements]"
+        assert _is_browser_page_content("x" * 478 + marker) is True
+        assert _is_browser_page_content("x" * 479 + marker) is False
+
+    def test_only_latest_snapshot_kept(self):
+        """Older snapshots are replaced with a one-line summary."""
+        history = [
+            ToolMessage(content='Page: "Old" URL: https://old.example\n...', tool_call_id="c1"),
+            HumanMessage(content='[Tool result: browser_click] Page: "Mid" URL: https://mid.example'),
+            ToolMessage(content='Page: "New" URL: https://new.example\n...', tool_call_id="c3"),
+        ]
+        assert _invalidate_stale_browser_results(history) == (2, 2)
+        assert history[0].content.startswith("[Stale page snapshot replaced]")
+        assert history[0].tool_call_id == "c1"
+        assert "https://mid.example" in history[1].content
+        assert history[2].content.startswith('Page: "New"')
+
+    def test_scan_stops_at_start(self):
+        """Snapshots below ``start`` are left alone."""
+        history = [
+            ToolMessage(content='Page: "A" URL: https://a.example', tool_call_id="c1"),
+            ToolMessage(content='Page: "B" URL: https://b.example', tool_call_id="c2"),
+            ToolMessage(content='Page: "C" URL: https://c.example', tool_call_id="c3"),
+        ]
+        assert _invalidate_stale_browser_results(history, start=1) == (1, 2)
+        assert history[0].content.startswith('Page: "A"')
+        assert history[1].content.startswith("[Stale page snapshot replaced]")
+
+    @pytest.mark.asyncio
+    async def test_later_pages_scan_from_previous_snapshot(self):
+        """Follow-up invalidations start at the snapshot kept last time."""
+        svc = _create_service()
+        svc.sessions["s1"] = []
+        calls = []
+        real = agent_service_module._invalidate_stale_browser_results
+
+        def spy(lc_history, start=0):
+            calls.append(start)
+            return real(lc_history, start)
+
+        with patch.object(agent_service_module, "_invalidate_stale_browser_results", side_effect=spy):
+            for i in range(3):
+                ai = AIMessage(content="", tool_calls=[{"name": "browser_navigate", "args": {}, "id": f"c{i}"}])
+                await svc.append_tool_interaction(
+                    "s1",
+                    [],
+                    ai.tool_calls,
+                    [
+                        Message(
+                            role=MessageRole.TOOL,
+                            content=f'Page: "P{i}" URL: https://{i}.example',
+                            tool_call_id=f"c{i}",
+                            tool_name="browser_navigate",
+                        )
+                    ],
+                    assistant_lc_message=ai,
+                )
+        assert calls == [0, 1, 3]
+        contents = [m.content for m in svc._lc_sessions["s1"] if isinstance(m, ToolMessage)]
+        assert [c.startswith("[Stale") for c in contents] == [True, True, False]
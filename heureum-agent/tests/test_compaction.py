@@ -2,25 +2,44 @@
 
 """Tests for the compaction module — truncation, pruning, repair, and summarization."""
 
+import asyncio
+import json
 from typing import List, Optional
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from app.models import Message
 from app.schemas.open_responses import MessageRole
 from app.services.compaction.pruning import (
+    _compile_patterns,
     _find_assistant_cutoff_index,
     _find_first_user_index,
     _is_tool_prunable,
     _soft_trim_content,
+    _soft_trim_message,
+    _soft_trimmed_length,
     prune_context_messages,
 )
 from app.services.compaction.repair import repair_tool_use_result_pairing
-from app.services.compaction.settings import CompactionSettings, HardClearConfig, ToolPruningConfig
-from app.services.compaction.tokens import estimate_context_chars, estimate_message_chars
+from app.services.compaction.settings import (
+    CompactionSettings,
+    HardClearConfig,
+    SoftTrimConfig,
+    ToolPruningConfig,
+)
+from app.services.compaction.tokens import (
+    TOOL_CALL_FALLBACK_CHARS,
+    estimate_context_chars,
+    estimate_message_chars,
+    estimate_message_tokens,
+    estimate_messages_tokens,
+    estimate_tokens,
+    estimate_tokens_batch,
+)
 from app.services.compaction.summarizer import (
     _chunk_messages_by_max_tokens,
     _compute_adaptive_chunk_ratio,
+    _find_kept_tail_cutoff,
     _messages_to_text,
     _split_by_token_share,
     compact_history,
@@ -126,6 +145,18 @@ class TestTruncateToolResultText:
         # Should cut at the newline (4500) since 4500 > 5000 * 0.8 = 4000
         assert len(result) == 4_500
 
+    def test_newline_before_window_ignored(self):
+        """Verify a newline at or before the 80 % mark does not move the cut."""
+        text = "A" * 4_000 + "\n" + "B" * 5_999
+        result = truncate_tool_result_text(text, 5_000, suffix="")
+        assert len(result) == 5_000
+
+    def test_newline_just_past_window_start(self):
+        """Verify a newline one char past the 80 % mark is used as the cut."""
+        text = "A" * 4_001 + "\n" + "B" * 5_998
+        result = truncate_tool_result_text(text, 5_000, suffix="")
+        assert len(result) == 4_001
+
     def test_no_newline_cuts_at_keep_chars(self):
         """Verify truncation cuts at keep_chars when no newline is found."""
         text = "x" * 10_000  # no newlines
@@ -188,6 +219,15 @@ class TestTruncateOversizedToolResults:
         assert count == 1
         assert len(result[0].content) < 50_000
 
+    def test_truncated_message_size_not_inherited(self):
+        """Verify a truncated copy is measured afresh, not from the original's memo."""
+        s = self._settings(window=1_000)
+        msgs = [Message(role=MessageRole.TOOL, content="x" * 50_000, tool_call_id="c1", tool_name="bash")]
+        before = estimate_message_tokens(msgs[0])
+        result, _ = truncate_oversized_tool_results(msgs, s)
+        assert (result[0].tool_call_id, result[0].tool_name) == ("c1", "bash")
+        assert estimate_message_tokens(result[0]) < before
+
     def test_multiple_tools_mixed(self):
         """Verify only oversized tool results are truncated in a mixed list."""
         s = self._settings(window=1_000)
@@ -209,6 +249,20 @@ class TestTruncateOversizedToolResults:
         truncate_oversized_tool_results(msgs, s)
         assert len(original.content) == 50_000
 
+    def test_returns_new_list_with_untouched_messages_shared(self):
+        """Verify the input list is not mutated and unchanged messages are reused."""
+        s = self._settings(window=1_000)
+        keep = Message(role=MessageRole.USER, content="q")
+        big = Message(role=MessageRole.TOOL, content="x" * 50_000, tool_call_id="c1", tool_name="bash")
+        msgs = [keep, big]
+        result, count = truncate_oversized_tool_results(msgs, s)
+        assert count == 1
+        assert result is not msgs
+        assert msgs[1] is big
+        assert result[0] is keep
+        assert result[1].tool_call_id == "c1"
+        assert result[1].tool_name == "bash"
+
 
 # ---------------------------------------------------------------------------
 # has_oversized_tool_results
@@ -336,6 +390,27 @@ class TestSoftTrimContent:
         assert result.startswith("x" * 10)
         assert "last 0 chars" in result
 
+    @pytest.mark.parametrize("length,head,tail", [(100, 10, 0), (5_000, 1_500, 1_500), (12_345, 7, 99_999)])
+    def test_predicted_length_matches_output(self, length, head, tail):
+        """Verify the precomputed trimmed length equals the real output length."""
+        text = "x" * length
+        assert _soft_trimmed_length(length, head, tail) == len(_soft_trim_content(text, head, tail))
+
+    def test_message_not_trimmed_when_not_shorter(self):
+        """Verify no copy is made when the note would outweigh the cut."""
+        s = CompactionSettings(soft_trim=SoftTrimConfig(max_chars=10, head_chars=50, tail_chars=50))
+        msg = Message(role=MessageRole.TOOL, content="x" * 120, tool_call_id="c1")
+        assert _soft_trim_message(msg, s) is None
+
+    def test_trimmed_message_keeps_fields(self):
+        """Verify the trimmed copy carries over the tool result fields."""
+        msg = Message(role=MessageRole.TOOL, content="x" * 10_000, tool_call_id="c1", tool_name="bash")
+        trimmed = _soft_trim_message(msg, CompactionSettings())
+        assert trimmed is not None
+        assert len(trimmed.content) < 10_000
+        assert (trimmed.role, trimmed.tool_call_id, trimmed.tool_name) == (MessageRole.TOOL, "c1", "bash")
+        assert trimmed.tool_calls is None
+
 
 # ---------------------------------------------------------------------------
 # prune_context_messages — integration
@@ -375,6 +450,20 @@ class TestPruneContextMessages:
         msgs = [_msg(MessageRole.TOOL, "x" * 10_000)]
         assert prune_context_messages(msgs, s) is msgs
 
+    def test_fractional_threshold_matches_ratio(self):
+        """Verify the char threshold agrees with the ratio when ratio * window is fractional."""
+        msgs = [
+            Message(role=MessageRole.USER, content="hi"),
+            Message(role=MessageRole.TOOL, content="T" * 10_000),
+            Message(role=MessageRole.ASSISTANT, content="r1"),
+        ]
+        total = estimate_context_chars(msgs)
+        window = 20_000
+        below = self._settings(context_window_tokens=5_000, soft_trim_ratio=(total + 0.5) / window, keep_last_assistants=0)
+        above = self._settings(context_window_tokens=5_000, soft_trim_ratio=(total - 0.5) / window, keep_last_assistants=0)
+        assert prune_context_messages(msgs, below) is msgs
+        assert prune_context_messages(msgs, above) is not msgs
+
     # -- soft trim ---
 
     def test_soft_trim_triggers(self):
@@ -389,6 +478,9 @@ class TestPruneContextMessages:
         ]
         result = prune_context_messages(msgs, s)
         assert len(result[1].content) < 10_000
+        assert result is not msgs
+        assert len(msgs[1].content) == 10_000
+        assert all(result[i] is msgs[i] for i in (0, 2, 3, 4))
 
     # -- hard clear ---
 
@@ -405,6 +497,89 @@ class TestPruneContextMessages:
         result = prune_context_messages(msgs, s)
         assert "cleared" in result[1].content.lower()
 
+    def test_hard_cleared_message_keeps_fields(self):
+        """Verify the cleared copy carries over the tool result fields."""
+        s = self._settings(hard_clear_ratio=0.3)
+        msgs = [
+            Message(role=MessageRole.USER, content="hi"),
+            Message(
+                role=MessageRole.TOOL,
+                content="T" * 100_000,
+                tool_call_id="c1",
+                tool_name="bash",
+            ),
+            Message(role=MessageRole.ASSISTANT, content="r1"),
+            Message(role=MessageRole.USER, content="q2"),
+            Message(role=MessageRole.ASSISTANT, content="r2"),
+        ]
+        cleared = prune_context_messages(msgs, s)[1]
+        assert "cleared" in cleared.content.lower()
+        assert (cleared.role, cleared.tool_call_id, cleared.tool_name) == (
+            MessageRole.TOOL,
+            "c1",
+            "bash",
+        )
+
+    def test_each_input_message_measured_once(self):
+        """Verify original messages are measured once across both phases."""
+        s = self._settings(hard_clear_ratio=0.3)
+        msgs = [
+            Message(role=MessageRole.USER, content="hi"),
+            Message(role=MessageRole.TOOL, content="T" * 100_000),
+            Message(
+                role=MessageRole.ASSISTANT,
+                content="r1",
+                tool_calls=[{"id": "c1", "name": "bash", "args": {"command": "ls"}}],
+            ),
+            Message(role=MessageRole.USER, content="q2"),
+            Message(role=MessageRole.ASSISTANT, content="r2"),
+        ]
+        with patch(
+            "app.services.compaction.pruning.estimate_message_chars",
+            side_effect=estimate_message_chars,
+        ) as measure:
+            result = prune_context_messages(msgs, s)
+        assert "cleared" in result[1].content.lower()
+        measured = [call.args[0] for call in measure.call_args_list]
+        assert all(sum(m is orig for m in measured) == 1 for orig in msgs)
+
+    def test_hard_clear_overshoots_trigger(self):
+        """Verify hard clear continues past the trigger ratio by the configured overshoot."""
+        msgs = [Message(role=MessageRole.USER, content="hi")]
+        for n in range(3):
+            msgs.append(Message(role=MessageRole.TOOL, content="T" * 600, tool_call_id=f"c{n}"))
+        msgs.append(Message(role=MessageRole.ASSISTANT, content="r1"))
+
+        exact = prune_context_messages(msgs, self._settings(hard_clear_overshoot=0.0))
+        assert ["cleared" in m.content.lower() for m in exact[1:4]] == [True, True, False]
+
+        batched = prune_context_messages(msgs, self._settings(hard_clear_overshoot=0.2))
+        assert all("cleared" in m.content.lower() for m in batched[1:4])
+
+    def test_cleared_size_measured_once(self):
+        """Verify the placeholder size is measured once however many results are cleared."""
+        s = self._settings(hard_clear_ratio=0.001)
+        msgs = [Message(role=MessageRole.USER, content="hi")]
+        for n in range(3):
+            msgs.append(Message(role=MessageRole.TOOL, content="T" * 1_000, tool_call_id=f"c{n}"))
+        msgs.append(Message(role=MessageRole.ASSISTANT, content="r1"))
+        with patch(
+            "app.services.compaction.pruning.estimate_message_chars",
+            side_effect=estimate_message_chars,
+        ) as measure:
+            result = prune_context_messages(msgs, s)
+        assert all("cleared" in result[i].content.lower() for i in (1, 2, 3))
+        cleared = [call.args[0] for call in measure.call_args_list if call.args[0] not in msgs]
+        assert len(cleared) == 1
+
+    def test_history_without_tool_results_not_measured(self):
+        """Verify an over-budget history with no tool results is returned unmeasured."""
+        s = self._settings()
+        msgs = [_msg(MessageRole.USER, "U" * 5_000), _msg(MessageRole.ASSISTANT, "A" * 5_000)]
+        with patch("app.services.compaction.pruning.estimate_message_chars") as measure:
+            assert prune_context_messages(msgs, s) is msgs
+        measure.assert_not_called()
+
     def test_hard_clear_disabled(self):
         """Verify hard clear is skipped when disabled in configuration."""
         s = self._settings(
@@ -453,6 +628,25 @@ class TestPruneContextMessages:
         assert result[0].content == msgs[0].content
         assert result[1].content == msgs[1].content
 
+    @pytest.mark.parametrize("keep", [0, 1, 2, 5])
+    def test_pruned_range_matches_index_helpers(self, keep):
+        """Verify the single-pass scan prunes exactly the helper-derived range."""
+        s = self._settings(keep_last_assistants=keep)
+        roles = [
+            MessageRole.SYSTEM, MessageRole.TOOL, MessageRole.USER, MessageRole.TOOL,
+            MessageRole.ASSISTANT, MessageRole.TOOL, MessageRole.USER, MessageRole.TOOL,
+            MessageRole.ASSISTANT, MessageRole.TOOL, MessageRole.ASSISTANT,
+        ]
+        msgs = [
+            Message(role=r, content="T" * 10_000 if r == MessageRole.TOOL else "m") for r in roles
+        ]
+        start = _find_first_user_index(msgs) or 0
+        cutoff = _find_assistant_cutoff_index(msgs, keep)
+        result = prune_context_messages(msgs, s)
+        for i, (before, after) in enumerate(zip(msgs, result)):
+            expected_pruned = before.role == MessageRole.TOOL and start <= i < cutoff
+            assert (after.content != before.content) is expected_pruned, i
+
     # -- edge cases ---
 
     def test_no_user_messages(self):
@@ -595,6 +789,21 @@ class TestRepairActive:
         assert report.dropped_orphan_count == 0
         assert len(report.messages) == 3
 
+    def test_drops_tool_with_empty_id(self):
+        """Verify an empty tool_call_id counts as an ID that matches no call."""
+        msgs = [
+            Message(
+                role=MessageRole.ASSISTANT,
+                content="use",
+                tool_calls=[{"id": "call_X"}],
+            ),
+            Message(role=MessageRole.TOOL, content="matched", tool_call_id="call_X"),
+            Message(role=MessageRole.TOOL, content="blank", tool_call_id=""),
+        ]
+        report = repair_tool_use_result_pairing(msgs)
+        assert report.dropped_orphan_count == 1
+        assert [m.content for m in report.messages] == ["use", "matched"]
+
     def test_multiple_orphans(self):
         """Verify multiple orphaned tool results are all dropped."""
         msgs = [
@@ -659,6 +868,36 @@ class TestRepairActive:
         # No matching tool_use for call_X → orphan is dropped
         assert report.dropped_orphan_count == 1
 
+    def test_tool_result_before_its_call_is_kept(self):
+        """A tool result preceding its assistant call is matched, not dropped."""
+        msgs = [
+            Message(role=MessageRole.TOOL, content="early", tool_call_id="call_1"),
+            Message(role=MessageRole.ASSISTANT, content="use", tool_calls=[{"id": "call_1"}]),
+            Message(role=MessageRole.TOOL, content="orphan", tool_call_id="call_2"),
+        ]
+        report = repair_tool_use_result_pairing(msgs)
+        assert report.dropped_orphan_count == 1
+        assert [m.content for m in report.messages] == ["early", "use"]
+
+    def test_repeated_orphan_id_counts_each_result(self):
+        """Every tool result carrying an orphaned ID is dropped and counted."""
+        msgs = [
+            Message(role=MessageRole.USER, content="q"),
+            Message(role=MessageRole.TOOL, content="a", tool_call_id="call_GONE"),
+            Message(role=MessageRole.TOOL, content="b", tool_call_id="call_GONE"),
+        ]
+        report = repair_tool_use_result_pairing(msgs)
+        assert report.dropped_orphan_count == 2
+        assert [m.content for m in report.messages] == ["q"]
+
+    def test_nothing_dropped_returns_input(self):
+        """When every result is matched the input list is returned as-is."""
+        msgs = [
+            Message(role=MessageRole.ASSISTANT, content="use", tool_calls=[{"id": "call_1"}]),
+            Message(role=MessageRole.TOOL, content="ok", tool_call_id="call_1"),
+        ]
+        assert repair_tool_use_result_pairing(msgs).messages is msgs
+
 
 # ===========================================================================
 # Layer 3 — LLM compaction (summarizer)
@@ -690,6 +929,33 @@ class TestMessagesToText:
         """Verify empty input returns an empty string."""
         assert _messages_to_text([]) == ""
 
+    def test_max_chars_caps_total(self):
+        """Verify the total cap truncates the crossing section and drops the rest."""
+        msgs = [_msg(MessageRole.USER, "a" * 50), _msg(MessageRole.USER, "b" * 50), _msg(MessageRole.USER, "c" * 50)]
+        text = _messages_to_text(msgs, max_chars=80)
+        assert len(text) == 80
+        assert text.startswith("[User]: " + "a" * 50 + "\n\n[User]: b")
+        assert "c" not in text
+        assert _messages_to_text(msgs, max_chars=10_000) == _messages_to_text(msgs)
+
+    def test_tool_calls_section(self):
+        """Verify tool calls render as name(key=json) sections, with a str fallback."""
+        msgs = [
+            Message(
+                role=MessageRole.ASSISTANT,
+                content="",
+                tool_calls=[
+                    {"name": "web_search", "args": {"query": "날씨", "limit": 3}},
+                    {"name": "bash", "args": {"x": object}},
+                ],
+            ),
+            Message(role=MessageRole.TOOL, content="sunny", tool_name="web_search"),
+        ]
+        text = _messages_to_text(msgs)
+        first, second = text.split("\n\n")
+        assert first.startswith('[Assistant tool calls]: web_search(query="날씨", limit=3); bash(')
+        assert second == "[Tool result (web_search)]: sunny"
+
 
 class TestChunkMessagesByMaxTokens:
     """Tests for _chunk_messages_by_max_tokens splitting logic."""
@@ -716,6 +982,15 @@ class TestChunkMessagesByMaxTokens:
         """Verify empty input returns an empty list."""
         assert _chunk_messages_by_max_tokens([], 100) == []
 
+    def test_no_adjacent_chunks_mergeable(self):
+        """Verify no two adjacent chunks would fit the budget together, even around an oversized message."""
+        sizes = [200, 200, 4_000, 200, 200, 200, 600, 200]
+        msgs = [_msg(MessageRole.USER, "x" * n) for n in sizes]
+        chunks = _chunk_messages_by_max_tokens(msgs, max_tokens=300)
+        tokens = [sum(estimate_message_tokens(m) for m in chunk) for chunk in chunks]
+        assert all(a + b > 300 for a, b in zip(tokens, tokens[1:]))
+        assert [m for chunk in chunks for m in chunk] == msgs
+
 
 class TestSplitByTokenShare:
     """Tests for _split_by_token_share proportional splitting."""
@@ -744,6 +1019,19 @@ class TestSplitByTokenShare:
         """Verify empty input returns an empty list."""
         assert _split_by_token_share([], parts=3) == []
 
+    def test_boundaries_nearest_token_share(self):
+        """Verify each cut lands at the boundary closest to its share of the total."""
+        sizes = [1_000, 100, 100, 100, 100, 1_000]
+        msgs = [_msg(MessageRole.USER, "x" * n) for n in sizes]
+        splits = _split_by_token_share(msgs, parts=3)
+        assert [len(s) for s in splits] == [1, 4, 1]
+
+    def test_large_message_does_not_swallow_parts(self):
+        """Verify a dominant message still leaves the requested number of non-empty parts."""
+        msgs = [_msg(MessageRole.USER, "x" * n) for n in (4_000, 40, 40)]
+        splits = _split_by_token_share(msgs, parts=3)
+        assert [len(s) for s in splits] == [1, 1, 1]
+
 
 class TestComputeAdaptiveChunkRatio:
     """Tests for _compute_adaptive_chunk_ratio scaling behavior."""
@@ -810,6 +1098,40 @@ class TestSummarizeChunks:
         await summarize_chunks(msgs, llm, 300)
         assert llm.ainvoke.call_count > 1
 
+    @pytest.mark.asyncio
+    async def test_oversized_tool_call_input_capped(self):
+        """Verify a single huge tool-call message is serialized within the chunk's char budget."""
+        llm = _mock_llm("summary")
+        msgs = [
+            Message(
+                role=MessageRole.ASSISTANT,
+                content="writing",
+                tool_calls=[{"name": "write_file", "args": {"content": "x" * 100_000}}],
+            )
+        ]
+        await summarize_chunks(msgs, llm, 1_000)
+        prompt = llm.ainvoke.call_args.args[0][1].content
+        assert len(prompt) < 10_000
+
+    @pytest.mark.asyncio
+    async def test_input_cap_uses_settings_chars_per_token(self):
+        """Verify the serialized input cap scales with chars_per_token."""
+        msgs = [
+            Message(
+                role=MessageRole.ASSISTANT,
+                content="writing",
+                tool_calls=[{"name": "write_file", "args": {"content": "x" * 100_000}}],
+            )
+        ]
+        prompts = []
+        for chars_per_token in (2, 8):
+            llm = _mock_llm("summary")
+            await summarize_chunks(
+                msgs, llm, 1_000, settings=CompactionSettings(chars_per_token=chars_per_token)
+            )
+            prompts.append(llm.ainvoke.call_args.args[0][1].content)
+        assert len(prompts[0]) < 5_000 < len(prompts[1]) < 15_000
+
 
 # ---------------------------------------------------------------------------
 # summarize_with_fallback
@@ -915,6 +1237,68 @@ class TestSummarizeInStages:
         assert result == "merged"
         assert llm.ainvoke.call_count >= 3
 
+    @pytest.mark.asyncio
+    async def test_parts_summarized_concurrently(self):
+        """Verify the split parts are summarized in parallel before merging."""
+        in_flight = 0
+        peak = 0
+
+        async def fake_ainvoke(messages):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            result = MagicMock()
+            result.content = "part"
+            return result
+
+        llm = AsyncMock()
+        llm.ainvoke.side_effect = fake_ainvoke
+        msgs = [_msg(MessageRole.USER, "x" * 2_000) for _ in range(4)]
+        result = await summarize_in_stages(
+            msgs,
+            llm,
+            CompactionSettings(context_window_tokens=10_000),
+            1_200,
+            parts=2,
+            min_messages_for_split=2,
+        )
+        assert result == "part"
+        assert llm.ainvoke.call_count == 3
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_part_concurrency_limited(self):
+        """Verify no more than max_concurrent_summaries parts are in flight at once."""
+        in_flight = 0
+        peak = 0
+
+        async def fake_ainvoke(messages):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            result = MagicMock()
+            result.content = "part"
+            return result
+
+        llm = AsyncMock()
+        llm.ainvoke.side_effect = fake_ainvoke
+        msgs = [_msg(MessageRole.USER, "x" * 2_000) for _ in range(6)]
+        result = await summarize_in_stages(
+            msgs,
+            llm,
+            CompactionSettings(context_window_tokens=10_000, max_concurrent_summaries=2),
+            1_200,
+            parts=3,
+            min_messages_for_split=2,
+        )
+        assert result == "part"
+        assert llm.ainvoke.call_count == 4
+        assert peak == 2
+
     @pytest.mark.asyncio
     async def test_empty(self):
         """Verify empty input returns the fallback message."""
@@ -927,6 +1311,42 @@ class TestSummarizeInStages:
         assert result == "No prior history."
 
 
+# ---------------------------------------------------------------------------
+# _find_kept_tail_cutoff
+# ---------------------------------------------------------------------------
+
+
+def _history(spec: str) -> List[Message]:
+    """Build a history from a compact spec: U=user, A=assistant, C=assistant with tool_calls, T=tool."""
+    roles = {"U": MessageRole.USER, "A": MessageRole.ASSISTANT, "C": MessageRole.ASSISTANT, "T": MessageRole.TOOL}
+    return [
+        Message(role=roles[c], content=c, tool_calls=[{"id": "c", "name": "bash", "args": {}}] if c == "C" else None)
+        for c in spec
+    ]
+
+
+class TestFindKeptTailCutoff:
+    """Tests for _find_kept_tail_cutoff tail boundary selection."""
+
+    @pytest.mark.parametrize(
+        "spec, keep, start_idx, expected",
+        [
+            ("UAUAUA", 1, 0, 5),
+            ("UAUAUA", 2, 0, 3),
+            ("UCTTA", 1, 0, 4),
+            ("UCTCTTA", 2, 0, 3),
+            ("UCTT", 1, 0, 1),  # lands on a tool result, walks back to its call
+            ("UCTT", 1, 2, 2),  # never walks back past start_idx
+            ("UCA", 1, 0, 1),  # keeps the tool-calling assistant before the cutoff
+            ("UAUA", 0, 0, 1),
+            ("UAUA", 10, 0, 0),
+        ],
+    )
+    def test_cutoff(self, spec, keep, start_idx, expected):
+        """Verify the cutoff for representative histories."""
+        assert _find_kept_tail_cutoff(_history(spec), keep, start_idx) == expected
+
+
 # ---------------------------------------------------------------------------
 # compact_history
 # ---------------------------------------------------------------------------
@@ -953,6 +1373,32 @@ class TestCompactHistory:
         assert result[0].content.startswith(COMPACTION_PREFIX)
         assert len(result) < len(msgs)
 
+    @pytest.mark.asyncio
+    async def test_each_content_tokenized_once(self):
+        """Verify a compaction cycle tokenizes each message's content at most once."""
+        s = CompactionSettings(context_window_tokens=500, keep_last_assistants=1)
+        msgs = []
+        for n in range(4):
+            msgs.append(_msg(MessageRole.USER, f"question {n} " + "q" * 300))
+            msgs.append(_msg(MessageRole.ASSISTANT, f"answer {n} " + "a" * 300))
+        seen: List[str] = []
+
+        def single(text):
+            seen.append(text)
+            return estimate_tokens(text)
+
+        def batch(texts):
+            seen.extend(texts)
+            return estimate_tokens_batch(texts)
+
+        with patch("app.services.compaction.tokens.estimate_tokens", side_effect=single), patch(
+            "app.services.compaction.summarizer.estimate_tokens", side_effect=single
+        ), patch("app.services.compaction.tokens.estimate_tokens_batch", side_effect=batch):
+            await compact_history(msgs, _mock_llm("summary"), s)
+        contents = [m.content for m in msgs]
+        assert all(seen.count(c) <= 1 for c in contents)
+        assert any(c in seen for c in contents)
+
     @pytest.mark.asyncio
     async def test_disabled(self):
         """Verify compaction returns original messages when disabled."""
@@ -1094,6 +1540,20 @@ class TestIsToolPrunable:
         cfg = ToolPruningConfig(allow=["bash"])
         assert _is_tool_prunable(None, cfg) is False
 
+    def test_combined_patterns_match_whole_name(self):
+        """Each alternative in the combined pattern must match the full name."""
+        cfg = ToolPruningConfig(allow=["bash", "read_*"])
+        assert _is_tool_prunable("bash_extra", cfg) is False
+        assert _is_tool_prunable("xread_file", cfg) is False
+
+    def test_patterns_compiled_once(self):
+        """Repeated checks reuse the compiled matcher."""
+        _compile_patterns.cache_clear()
+        cfg = ToolPruningConfig(deny=["send_*"], allow=["*"])
+        for name in ("bash", "send_email", "read_file"):
+            _is_tool_prunable(name, cfg)
+        assert _compile_patterns.cache_info().misses == 2
+
 
 class TestPruneWithToolName:
     """Tests for prune_context_messages respecting tool_name filtering."""
@@ -1188,3 +1648,79 @@ class TestCharsIncludeToolCalls:
         total = estimate_context_chars(msgs)
         content_only = sum(len(m.content) for m in msgs)
         assert total > content_only
+
+    def test_tool_calls_chars_match_per_call_serialisation(self):
+        """Tool-call chars equal the sum of each call's JSON length."""
+        calls = [
+            {"id": "c1", "name": "bash", "args": {"command": "ls"}},
+            {"id": "c2", "name": "web_search", "args": {"query": "날씨"}},
+        ]
+        msg = Message(role=MessageRole.ASSISTANT, content="ok", tool_calls=calls)
+        expected = sum(len(json.dumps(tc, ensure_ascii=False)) for tc in calls)
+        assert estimate_message_chars(msg) == len("ok") + expected
+
+    def test_unserialisable_tool_call_uses_fallback(self):
+        """A call that cannot be serialised counts as the fallback size."""
+        calls = [{"id": "c1", "name": "bash", "args": {}}, {"id": "c2", "args": {"x": object()}}]
+        msg = Message(role=MessageRole.ASSISTANT, content="", tool_calls=calls)
+        expected = len(json.dumps(calls[0])) + TOOL_CALL_FALLBACK_CHARS
+        assert estimate_message_chars(msg) == expected
+
+    def test_tool_calls_serialised_once_per_message(self):
+        """Repeated estimates reuse the memoised tool-call size."""
+        msg = Message(
+            role=MessageRole.ASSISTANT,
+            content="ok",
+            tool_calls=[{"id": "c1", "name": "bash", "args": {"command": "ls"}}],
+        )
+        with patch("app.services.compaction.tokens._encode_json", side_effect=json.dumps) as dumps:
+            first = estimate_message_chars(msg)
+            assert estimate_message_chars(msg) == first
+            estimate_context_chars([msg, msg])
+        assert dumps.call_count == 1
+
+
+class TestTokenEstimateMemo:
+    """Tests for per-message memoisation of token estimates."""
+
+    def test_each_message_tokenized_once(self):
+        """Repeated estimates of the same message reuse the first count."""
+        msgs = [
+            Message(role=MessageRole.USER, content="hello there"),
+            Message(role=MessageRole.ASSISTANT, content="ok", tool_calls=[{"id": "c1", "name": "bash", "args": {}}]),
+        ]
+        expected = 3 + estimate_message_chars(msgs[1]) // 4
+        with patch("app.services.compaction.tokens.estimate_tokens", return_value=3) as tokenize:
+            assert estimate_message_tokens(msgs[1]) == expected
+            assert estimate_message_tokens(msgs[1]) == expected
+        tokenize.assert_called_once_with("ok")
+
+    def test_tool_calls_tokens_not_tokenized(self):
+        """Tool-call size is converted arithmetically, without tokenizing a padding string."""
+        calls = [{"id": "c1", "name": "bash", "args": {"command": "x" * 4_000}}]
+        msg = Message(role=MessageRole.ASSISTANT, content="", tool_calls=calls)
+        with patch("app.services.compaction.tokens.estimate_tokens", return_value=1) as tokenize:
+            tokens = estimate_message_tokens(msg)
+        tokenize.assert_called_once_with("")
+        assert tokens == 1 + estimate_message_chars(msg) // 4
+
+    def test_list_estimate_batches_unmeasured_contents(self):
+        """Unmeasured contents are tokenized in one batch call, measured ones skipped."""
+        msgs = [Message(role=MessageRole.USER, content=f"message {n}") for n in range(4)]
+        expected = [estimate_tokens(m.content) for m in msgs]
+        estimate_message_tokens(msgs[0])
+        with patch(
+            "app.services.compaction.tokens.estimate_tokens_batch",
+            side_effect=estimate_tokens_batch,
+        ) as batch:
+            assert estimate_messages_tokens(msgs) == sum(expected)
+            assert estimate_messages_tokens(msgs) == sum(expected)
+        batch.assert_called_once_with([m.content for m in msgs[1:]])
+
+    def test_memo_does_not_affect_equality(self):
+        """A measured message still equals an unmeasured copy."""
+        msg = Message(role=MessageRole.ASSISTANT, content="ok", tool_calls=[{"id": "c1", "name": "bash", "args": {}}])
+        twin = Message(role=MessageRole.ASSISTANT, content="ok", tool_calls=[{"id": "c1", "name": "bash", "args": {}}])
+        estimate_message_tokens(msg)
+        assert msg == twin
+        assert "_sizes" not in msg.model_dump()
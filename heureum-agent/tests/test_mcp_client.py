@@ -2,6 +2,7 @@
 
 """Tests for MCP client (app/services/providers/mcp.py)."""
 
+import asyncio
 import json
 import sys
 import time
@@ -200,6 +201,47 @@ class TestDiscoverTools:
         assert client._tool_to_server["tool_a"] == "http://a"
         assert client._tool_to_server["tool_b"] == "http://b"
 
+    async def test_servers_queried_concurrently(self):
+        """A slow server does not delay listing the others."""
+        both_listing = asyncio.Barrier(2)
+
+        def _session(name):
+            session = _make_session(tools=[_mock_tool(name)])
+            response = session.list_tools.return_value
+
+            async def list_tools():
+                await asyncio.wait_for(both_listing.wait(), timeout=1)
+                return response
+
+            session.list_tools.side_effect = list_tools
+            return session
+
+        sessions = {"http://a": _session("tool_a"), "http://b": _session("tool_b")}
+        client = MCPClient(server_urls=["http://a", "http://b"])
+        client._get_session = AsyncMock(side_effect=sessions.get)
+
+        tools = await client.discover_tools()
+
+        assert [t["function"]["name"] for t in tools] == ["tool_a", "tool_b"]
+
+    async def test_failed_server_does_not_drop_others(self):
+        """One unreachable server is disconnected; the rest are merged."""
+        session_b = _make_session(tools=[_mock_tool("tool_b")])
+        client = MCPClient(server_urls=["http://a", "http://b"])
+
+        async def fake_get_session(url):
+            if url == "http://a":
+                raise ConnectionError("down")
+            return session_b
+
+        client._get_session = AsyncMock(side_effect=fake_get_session)
+        client._disconnect_server = AsyncMock()
+
+        tools = await client.discover_tools()
+
+        assert [t["function"]["name"] for t in tools] == ["tool_b"]
+        client._disconnect_server.assert_awaited_once_with("http://a")
+
 
 # ---------------------------------------------------------------------------
 # 3. TestGetSession
@@ -259,6 +301,32 @@ class TestGetSession:
         new_conn.connect.assert_awaited_once()
         assert session is new_session
 
+    async def test_concurrent_callers_share_one_connect(self):
+        """Callers racing on a cold server open a single connection."""
+        client = MCPClient(server_urls=["http://srv"])
+
+        mock_session = _make_session()
+        mock_conn = MagicMock(spec=_ServerConnection)
+        mock_conn.session = None
+
+        async def connect():
+            await asyncio.sleep(0)
+            mock_conn.session = mock_session
+            return mock_session
+
+        mock_conn.connect = AsyncMock(side_effect=connect)
+
+        with patch(
+            "app.services.providers.mcp._ServerConnection", return_value=mock_conn
+        ) as conn_cls:
+            sessions = await asyncio.gather(
+                *(client._get_session("http://srv") for _ in range(3))
+            )
+
+        assert sessions == [mock_session] * 3
+        assert conn_cls.call_count == 1
+        mock_conn.connect.assert_awaited_once()
+
 
 # ---------------------------------------------------------------------------
 # 4. TestCallTool (was 3)
@@ -604,6 +672,19 @@ class TestHandleApprovalResponse:
         assert len(result["filtered_messages"]) == 1
         assert result["filtered_messages"][0].content == "hello"
 
+    @pytest.mark.parametrize("prefix", ["User chose: ", "User input: ", ""])
+    def test_strips_client_display_prefix(self, prefix):
+        """Client display prefixes are removed from the answer."""
+        messages = [
+            Message(role=MessageRole.USER, content="hello"),
+            Message(
+                role=MessageRole.TOOL,
+                content=f"{prefix}{ApprovalChoice.DENY.value}",
+                tool_call_id="ask_1",
+            ),
+        ]
+        assert MCPClient._extract_approval_answer(messages, "ask_1") == ApprovalChoice.DENY.value
+
 
 # ---------------------------------------------------------------------------
 # 12. TestBuildChainedCalls — moved to tests/test_tool_chain.py
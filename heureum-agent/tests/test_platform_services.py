@@ -0,0 +1,312 @@
+# Copyright (c) 2026 Heureum AI. All rights reserved.
+
+"""Tests for the Platform API backed tool services."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from app.services import reliability
+from app.services.notification_service import NotificationService
+from app.services.periodic_task_service import PeriodicTaskService, _format_schedule
+from app.services.reliability import (
+    CircuitBreaker,
+    CircuitOpenError,
+    request_with_retry,
+)
+
+
+def _platform_response(status_code: int = 200, payload=None, text: str = ""):
+    """Create a mock httpx response from a Platform internal endpoint."""
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.json.return_value = payload if payload is not None else {}
+    resp.text = text
+    return resp
+
+
+# ---------------------------------------------------------------------------
+# NotificationService
+# ---------------------------------------------------------------------------
+
+
+class TestNotificationService:
+    """Tests for notify_user through the shared HTTP client."""
+
+    @pytest.mark.asyncio
+    async def test_reuses_client_across_notifications(self):
+        """Every notification is posted through the same client."""
+        client = AsyncMock()
+        client.request.return_value = _platform_response(201)
+        svc = NotificationService(http_client=client)
+        for i in range(3):
+            result = await svc.execute(
+                "notify_user", {"title": f"t{i}", "body": "done"}, "s1"
+            )
+            assert result == f"Notification sent: t{i}"
+        assert client.request.await_count == 3
+        assert client.request.await_args.args[:2] == (
+            "POST",
+            "/api/v1/notifications/internal/send/",
+        )
+        assert client.request.await_args.kwargs["json"] == {
+            "session_id": "s1",
+            "title": "t2",
+            "body": "done",
+        }
+
+    @pytest.mark.asyncio
+    async def test_missing_fields_skip_platform(self):
+        """Validation errors are returned without a Platform call."""
+        client = AsyncMock()
+        svc = NotificationService(http_client=client)
+        assert await svc.execute("notify_user", {"body": "x"}, "s1") == (
+            "Error: title is required"
+        )
+        client.request.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_transport_error_reported(self):
+        """A failed request is reported as a tool error, not raised."""
+        client = AsyncMock()
+        client.request.side_effect = RuntimeError("boom")
+        svc = NotificationService(http_client=client)
+        result = await svc.execute("notify_user", {"title": "t", "body": "b"}, "s1")
+        assert result == "Error sending notification: boom"
+
+    @pytest.mark.asyncio
+    async def test_aclose_leaves_injected_client_open(self):
+        """Only a service-owned client is closed by aclose()."""
+        client = AsyncMock()
+        svc = NotificationService(http_client=client)
+        await svc.aclose()
+        client.aclose.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# PeriodicTaskService
+# ---------------------------------------------------------------------------
+
+
+class TestPeriodicTaskService:
+    """Tests for manage_periodic_task through the shared HTTP client."""
+
+    @pytest.mark.asyncio
+    async def test_actions_share_one_client(self):
+        """List, pause and resume all go through the injected client."""
+        client = AsyncMock()
+        client.request.side_effect = [
+            _platform_response(payload=[]),
+            _platform_response(payload={"status": "paused"}),
+            _platform_response(payload={"next_run_at": "soon"}),
+        ]
+        svc = PeriodicTaskService(http_client=client)
+
+        await svc.execute("manage_periodic_task", {"action": "list"}, "s1")
+        await svc.execute(
+            "manage_periodic_task", {"action": "pause", "task_id": "7"}, "s1"
+        )
+        await svc.execute(
+            "manage_periodic_task", {"action": "resume", "task_id": "7"}, "s1"
+        )
+
+        assert [c.args[:2] for c in client.request.await_args_list] == [
+            ("GET", "/api/v1/periodic-tasks/internal/list/"),
+            ("PATCH", "/api/v1/periodic-tasks/internal/7/update/"),
+            ("POST", "/api/v1/periodic-tasks/internal/7/resume/"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_aclose_leaves_injected_client_open(self):
+        """Only a service-owned client is closed by aclose()."""
+        client = AsyncMock()
+        svc = PeriodicTaskService(http_client=client)
+        await svc.aclose()
+        client.aclose.assert_not_called()
+
+
+
+class TestFormatSchedule:
+    """Tests for _format_schedule()."""
+
+    @pytest.mark.parametrize(
+        "cron, expected",
+        [
+            ({"hour": 9, "minute": 5, "day_of_week": "*"}, "Every day at 9:05"),
+            ({"hour": 18, "minute": 0, "day_of_week": "1-5"}, "Weekdays at 18:00"),
+            ({"hour": 7, "minute": 30, "day_of_week": "1"}, "Every Monday at 7:30"),
+            ({"hour": 7, "minute": 30, "day_of_week": 0}, "Every Sunday at 7:30"),
+            ({"hour": "*", "minute": 15, "day_of_week": "1,3"}, "Day 1,3 at every hour at :15"),
+        ],
+    )
+    def test_cron(self, cron, expected):
+        """Known day_of_week values get a label; others fall back to the raw value."""
+        assert _format_schedule({"type": "cron", "cron": cron}) == expected
+
+    def test_interval(self):
+        """Interval schedules read as 'Every N unit'."""
+        schedule = {"type": "interval", "interval": {"every": 2, "unit": "days"}}
+        assert _format_schedule(schedule) == "Every 2 days"
+
+# ---------------------------------------------------------------------------
+# request_with_retry
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def no_sleep():
+    """Skip backoff delays."""
+    with patch.object(reliability.asyncio, "sleep", AsyncMock()) as sleep:
+        yield sleep
+
+
+class TestRequestWithRetry:
+    """Tests for transient-failure retries on Platform calls."""
+
+    @pytest.mark.asyncio
+    async def test_retries_gateway_error_for_get(self, no_sleep):
+        """A 502 on an idempotent request is retried until it succeeds."""
+        client = AsyncMock()
+        client.request.side_effect = [_platform_response(502), _platform_response(200)]
+        resp = await request_with_retry(client, "GET", "/x")
+        assert resp.status_code == 200
+        assert client.request.await_count == 2
+        assert no_sleep.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_post_not_replayed_after_gateway_error(self, no_sleep):
+        """A 502 on a POST may have been processed, so it is not retried."""
+        client = AsyncMock()
+        client.request.return_value = _platform_response(502)
+        resp = await request_with_retry(client, "POST", "/x")
+        assert resp.status_code == 502
+        assert client.request.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_post_retried_when_never_sent(self, no_sleep):
+        """Connection failures are retried for any method."""
+        client = AsyncMock()
+        client.request.side_effect = [
+            httpx.ConnectError("refused"),
+            _platform_response(201),
+        ]
+        resp = await request_with_retry(client, "POST", "/x")
+        assert resp.status_code == 201
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, no_sleep):
+        """The last transport error is raised once retries are exhausted."""
+        client = AsyncMock()
+        client.request.side_effect = httpx.ConnectError("refused")
+        with patch.object(reliability.settings, "PLATFORM_API_MAX_RETRIES", 2):
+            with pytest.raises(httpx.ConnectError):
+                await request_with_retry(client, "GET", "/x")
+        assert client.request.await_count == 3
+
+
+    @pytest.mark.asyncio
+    async def test_attempt_timeout_bounded_by_deadline(self, no_sleep):
+        """Each attempt is given only the time left before the deadline."""
+        client = AsyncMock()
+        client.request.return_value = _platform_response(200)
+        with patch.object(reliability.time, "monotonic", return_value=100.0):
+            await request_with_retry(client, "GET", "/x", deadline=104.0)
+        timeout = client.request.await_args.kwargs["timeout"]
+        assert timeout.read == 4.0
+        assert timeout.connect == 2.0
+
+    @pytest.mark.asyncio
+    async def test_expired_deadline_skips_request(self, no_sleep):
+        """No request is sent once the deadline has passed."""
+        client = AsyncMock()
+        with patch.object(reliability.time, "monotonic", return_value=100.0):
+            with pytest.raises(httpx.TimeoutException):
+                await request_with_retry(client, "GET", "/x", deadline=99.0)
+        client.request.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_no_retry_past_deadline(self, no_sleep):
+        """A retry whose backoff would overrun the deadline is not scheduled."""
+        client = AsyncMock()
+        client.request.return_value = _platform_response(503)
+        with patch.object(reliability.time, "monotonic", return_value=100.0), \
+                patch.object(reliability, "_backoff_delay", return_value=1.0):
+            resp = await request_with_retry(client, "GET", "/x", deadline=100.5)
+        assert resp.status_code == 503
+        assert client.request.await_count == 1
+        no_sleep.assert_not_called()
+
+# ---------------------------------------------------------------------------
+# CircuitBreaker
+# ---------------------------------------------------------------------------
+
+
+class TestCircuitBreaker:
+    """Tests for fail-fast behaviour while the Platform is down."""
+
+    def test_opens_after_threshold(self):
+        """Consecutive failures open the circuit and reject calls."""
+        breaker = CircuitBreaker("p", fail_threshold=2, reset_after=30)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_half_open_trial_closes_on_success(self):
+        """After reset_after one trial call is admitted; success closes."""
+        breaker = CircuitBreaker("p", fail_threshold=1, reset_after=30)
+        with patch.object(reliability.time, "monotonic", return_value=100.0):
+            breaker.record_failure()
+        with patch.object(reliability.time, "monotonic", return_value=131.0):
+            breaker.before_call()
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+            breaker.record_success()
+            breaker.before_call()
+
+    def test_half_open_trial_failure_reopens(self):
+        """A failed trial re-opens the circuit for another reset period."""
+        breaker = CircuitBreaker("p", fail_threshold=1, reset_after=30)
+        with patch.object(reliability.time, "monotonic", return_value=100.0):
+            breaker.record_failure()
+        with patch.object(reliability.time, "monotonic", return_value=131.0):
+            breaker.before_call()
+            breaker.record_failure()
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_half_open_trial_frees_slot(self):
+        """A cancelled trial does not leave the circuit stuck open."""
+        breaker = CircuitBreaker("p", fail_threshold=1, reset_after=0)
+        breaker.record_failure()
+        client = AsyncMock()
+
+        async def hang(*args, **kwargs):
+            await asyncio.Event().wait()
+
+        client.request.side_effect = hang
+
+        trial = asyncio.create_task(
+            request_with_retry(client, "GET", "/x", breaker=breaker)
+        )
+        await asyncio.sleep(0)
+        assert client.request.await_count == 1
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        breaker.before_call()
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_tool_fast(self):
+        """An open circuit is reported without touching the network."""
+        client = AsyncMock()
+        breaker = CircuitBreaker("Platform API", fail_threshold=1)
+        breaker.record_failure()
+        svc = NotificationService(http_client=client, breaker=breaker)
+        result = await svc.execute("notify_user", {"title": "t", "body": "b"}, "s1")
+        assert "circuit open" in result
+        client.request.assert_not_called()
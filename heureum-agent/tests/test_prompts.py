@@ -2,12 +2,16 @@
 
 """Unit tests for app.services.prompts.base module."""
 
+from unittest.mock import patch
+
 import pytest
 
+from app.services.prompts import base as prompts_base
 from app.services.prompts.base import COMPACTION_PREFIX, HARD_CLEAR_PLACEHOLDER
 from app.services.prompts.base import (
     AGENT_IDENTITY_PROMPT,
     _build_mcp_tools_prompt,
+    build_identity_prompt,
     build_system_prompt,
 )
 
@@ -163,3 +167,27 @@ class TestPromptConstants:
 
     def test_hard_clear_placeholder_value(self):
         assert HARD_CLEAR_PLACEHOLDER == "[Previous tool results have been cleared]"
+
+
+# ---------------------------------------------------------------------------
+# TestBuildIdentityPrompt
+# ---------------------------------------------------------------------------
+
+class TestBuildIdentityPrompt:
+    """Tests for build_identity_prompt()."""
+
+    def test_utc_stamp(self):
+        with patch.object(prompts_base.time, "time", return_value=0.5):
+            result = build_identity_prompt()
+        assert result.startswith(AGENT_IDENTITY_PROMPT)
+        assert result.endswith(
+            "\n<current_datetime>1970-01-01 00:00:00 UTC</current_datetime>"
+        )
+
+    def test_same_second_reuses_string(self):
+        with patch.object(prompts_base.time, "time", side_effect=[100.1, 100.9, 101.0]):
+            first = build_identity_prompt()
+            second = build_identity_prompt()
+            third = build_identity_prompt()
+        assert second is first
+        assert "00:01:41 UTC" in third
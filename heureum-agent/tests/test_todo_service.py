@@ -0,0 +1,125 @@
+# Copyright (c) 2026 Heureum AI. All rights reserved.
+
+"""Tests for TodoService."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app.services.todo_service import TodoService
+
+
+@pytest.fixture
+def service():
+    """TodoService with TODO.md persistence stubbed out."""
+    svc = TodoService(http_client=AsyncMock())
+    with patch.object(svc, "_write_todo_file", AsyncMock()):
+        yield svc
+
+
+# ---------------------------------------------------------------------------
+# get_state_prompt caching
+# ---------------------------------------------------------------------------
+
+
+class TestStatePromptCache:
+    """Tests for the cached system-prompt TODO block."""
+
+    @pytest.mark.asyncio
+    async def test_reused_until_mutation(self, service):
+        """The rendered block is reused until a step changes."""
+        await service.create("s1", "Ship it", ["build", "test"])
+        first = service.get_state_prompt("s1")
+        assert service.get_state_prompt("s1") is first
+
+        await service.update_step("s1", 0, "in_progress")
+        updated = service.get_state_prompt("s1")
+        assert updated is not first
+        assert "0. [in_progress] build" in updated
+
+    @pytest.mark.asyncio
+    async def test_add_steps_invalidates(self, service):
+        """Added steps show up in the next prompt."""
+        await service.create("s1", "Ship it", ["build"])
+        service.get_state_prompt("s1")
+        await service.add_steps("s1", ["deploy"])
+        assert "1. [pending] deploy" in service.get_state_prompt("s1")
+
+    @pytest.mark.asyncio
+    async def test_new_plan_includes_previous_attempt(self, service):
+        """Re-planning archives the old plan into previous_attempts."""
+        await service.create("s1", "First try", ["a"])
+        service.get_state_prompt("s1")
+        await service.create("s1", "Second try", ["b"])
+        prompt = service.get_state_prompt("s1")
+        assert "<previous_attempts>" in prompt
+        assert "Task: First try" in prompt
+        assert "Task: Second try" in prompt
+
+    @pytest.mark.asyncio
+    async def test_clear_session_drops_cache(self, service):
+        """An evicted session starts without a TODO block."""
+        await service.create("s1", "Ship it", ["build"])
+        service.get_state_prompt("s1")
+        service.clear_session("s1")
+        assert service.get_state_prompt("s1") is None
+
+    def test_no_plan(self, service):
+        """Sessions without a plan get no TODO block."""
+        assert service.get_state_prompt("s1") is None
+
+
+# ---------------------------------------------------------------------------
+# TODO.md persistence
+# ---------------------------------------------------------------------------
+
+
+class TestWriteTodoFile:
+    """Tests for TODO.md writes through the shared HTTP client."""
+
+    @pytest.mark.asyncio
+    async def test_step_updates_reuse_client(self):
+        """Every mutation writes TODO.md through the injected client."""
+        client = AsyncMock()
+        client.request.return_value.status_code = 201
+        svc = TodoService(http_client=client)
+
+        await svc.create("s1", "Ship it", ["build", "test"])
+        await svc.update_step("s1", 0, "completed", "ok")
+
+        assert client.request.await_count == 2
+        assert client.request.await_args.args[:2] == (
+            "POST",
+            "/api/v1/sessions/s1/files/write/",
+        )
+        body = client.request.await_args.kwargs["json"]
+        assert body["path"].startswith("TODO-ship-it-")
+        assert "- [x] ~~build~~ ✓" in body["content"]
+
+    @pytest.mark.asyncio
+    async def test_aclose_leaves_injected_client_open(self):
+        """Only a service-owned client is closed by aclose()."""
+        client = AsyncMock()
+        svc = TodoService(http_client=client)
+        await svc.aclose()
+        client.aclose.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# _make_todo_filename
+# ---------------------------------------------------------------------------
+
+
+class TestMakeTodoFilename:
+    """Tests for TODO filename slugs."""
+
+    def test_slug(self):
+        """Non-alphanumeric runs collapse to single dashes."""
+        name = TodoService._make_todo_filename("  Fix the API: retry & log!  ")
+        assert name.startswith("TODO-fix-the-api-retry-log-")
+        assert name.endswith(".md")
+
+    def test_long_task_truncated(self):
+        """Slugs are capped at 40 characters."""
+        name = TodoService._make_todo_filename("word " * 500)
+        slug = name[len("TODO-"):-len("-HHMMSS.md")]
+        assert slug == ("word-" * 8)[:40]